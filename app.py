@@ -1,9 +1,19 @@
 import os
+import functools
 import logging
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
+from flask_compress import Compress
 from werkzeug.utils import secure_filename
+from werkzeug.exceptions import RequestEntityTooLarge
+from streaming_form_data import ParseFailedException, StreamingFormDataParser
+from streaming_form_data.targets import BaseTarget, FileTarget, ValueTarget
 import json
+import orjson
+import tempfile
+import threading
+import time
 from datetime import datetime
 
 # Your config loader
@@ -12,25 +22,55 @@ from config import get_config, init_app_config
 # Single shared db instance
 from extensions import db
 
+class ORJSONProvider(DefaultJSONProvider):
+    """jsonify/request.get_json via orjson; types orjson can't encode fall back to Flask's hook"""
+    # Dates go through Flask's hook (HTTP dates) so payloads and their ETags
+    # match what the default provider produced
+    dumps_options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _dumps_bytes(self, obj):
+        option = self.dumps_options
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self.default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj), mimetype=self.mimetype)
+
 # Initialize Flask
 app = Flask(__name__, static_folder='build', static_url_path='')
+app.json = ORJSONProvider(app)
 config_class = get_config()
 app.config.from_object(config_class)
 
+# Upload settings are fixed once the config is loaded; resolve them once
+ALLOWED_EXT = frozenset(ext.lower() for ext in app.config['ALLOWED_EXTENSIONS'])
+is_allowed_ext = ALLOWED_EXT.__contains__
+ALLOWED_EXT_LABEL = ", ".join(sorted(ALLOWED_EXT))
+UPLOAD_FOLDER = app.config['UPLOAD_FOLDER']
+
+# Read size for streaming uploads; MAX_CONTENT_LENGTH still caps request.stream
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 # Init extensions
 db.init_app(app)
 CORS(app)
+Compress(app)
 
 # Models (now import *after* db.init_app)
 from models import (
     Project, DataSource, TableInfo, DataDictionary,
-    EmbeddingModel, SearchIndex, ChatHistory, User
+    EmbeddingModel, SearchIndex, ChatHistory, ChatSession, User, Msgpack
 )
 
 # Services & routes
-from services.llm_service import LLMService
-from services.embedding_service import EmbeddingService
-from services.search_service import SearchService
 from services.data_service import DataService
 
 from routes.project_routes import project_bp
@@ -54,57 +94,158 @@ app.register_blueprint(admin_bp, url_prefix='/api/admin')
 init_app_config(app)
 
 # Error handlers and endpoints unchanged…
+# Error payloads never change, so serialize them once
+_NOT_FOUND_BODY = orjson.dumps({'error': 'Resource not found'})
+_INTERNAL_ERROR_BODY = orjson.dumps({'error': 'Internal server error'})
+_TOO_LARGE_BODY = orjson.dumps({'error': 'File too large'})
+
+def _json_error(body, status):
+    return Response(body, status=status, mimetype='application/json')
+
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({'error': 'Resource not found'}), 404
+    return _json_error(_NOT_FOUND_BODY, 404)
 
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
-    return jsonify({'error': 'Internal server error'}), 500
+    return _json_error(_INTERNAL_ERROR_BODY, 500)
 
 @app.errorhandler(413)
 def too_large(error):
-    return jsonify({'error': 'File too large'}), 413
+    return _json_error(_TOO_LARGE_BODY, 413)
+
+# Load-balancer probes can hit /api/health many times a second; answer them
+# from the last result for HEALTH_CACHE_TTL seconds
+HEALTH_CACHE_TTL = 1.0
+_health_cache = {'expires': 0.0, 'response': None}
+_health_lock = threading.Lock()
+
+def _check_database():
+    """Check out a pooled connection; pool_pre_ping validates it on checkout"""
+    connection = db.engine.connect()
+    connection.close()
 
 @app.route('/api/health')
 def health_check():
-    try:
-        db.session.execute('SELECT 1')
-        return jsonify({
-            'status': 'healthy',
-            'timestamp': datetime.utcnow().isoformat(),
-            'database': 'connected',
-            'version': '1.0.0'
-        })
-    except Exception as e:
-        return jsonify({
-            'status': 'unhealthy',
-            'error': str(e),
-            'timestamp': datetime.utcnow().isoformat()
-        }), 503
+    with _health_lock:
+        now = time.monotonic()
+        if now >= _health_cache['expires']:
+            try:
+                _check_database()
+                _health_cache['response'] = ({
+                    'status': 'healthy',
+                    'timestamp': datetime.utcnow().isoformat(),
+                    'database': 'connected',
+                    'version': '1.0.0'
+                }, 200)
+            except Exception as e:
+                _health_cache['response'] = ({
+                    'status': 'unhealthy',
+                    'error': str(e),
+                    'timestamp': datetime.utcnow().isoformat()
+                }, 503)
+            _health_cache['expires'] = now + HEALTH_CACHE_TTL
+        body, status = _health_cache['response']
+    return jsonify(body), status
+
+@functools.lru_cache(maxsize=4096)
+def _static_exists(path):
+    """Cached existence check for the React build; the build only changes on redeploy"""
+    return os.path.exists(os.path.join(app.static_folder, path))
 
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_react(path):
-    if path and os.path.exists(os.path.join(app.static_folder, path)):
+    if path and _static_exists(path):
         return send_from_directory(app.static_folder, path)
     return send_from_directory(app.static_folder, 'index.html')
 
+@functools.lru_cache(maxsize=1024)
+def _ensure_project_dir(project_id):
+    """Create a project's upload directory once and return its path"""
+    upload_path = os.path.join(UPLOAD_FOLDER, str(project_id))
+    os.makedirs(upload_path, exist_ok=True)
+    return upload_path
+
+def _move_into_project_dir(tmp_path, project_id, filename):
+    """Move a streamed upload into place (same filesystem, so no copy)"""
+    file_path = os.path.join(_ensure_project_dir(project_id), filename)
+    try:
+        os.replace(tmp_path, file_path)
+    except FileNotFoundError:
+        # Directory was removed since it was cached; recreate and retry
+        _ensure_project_dir.cache_clear()
+        file_path = os.path.join(_ensure_project_dir(project_id), filename)
+        os.replace(tmp_path, file_path)
+    return file_path
+
+class _TempFilesTarget(BaseTarget):
+    """Stream every part of a repeated file field into its own temp file"""
+    
+    def __init__(self, directory):
+        super().__init__()
+        self.directory = directory
+        self.files = []  # (temp path, multipart filename)
+        self._fd = None
+        self._path = None
+    
+    def on_start(self):
+        fd, self._path = tempfile.mkstemp(prefix='temp_', suffix='.upload', dir=self.directory)
+        self._fd = os.fdopen(fd, 'wb')
+    
+    def on_data_received(self, chunk):
+        self._fd.write(chunk)
+    
+    def on_finish(self):
+        self._fd.close()
+        self.files.append((self._path, self.multipart_filename))
+        self._fd = None
+        self._path = None
+    
+    def discard(self):
+        """Remove temp files that are still on disk, including a partial part"""
+        if self._fd:
+            self._fd.close()
+        paths = [path for path, _ in self.files] + ([self._path] if self._path else [])
+        for path in paths:
+            if os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and delegate to datasource service"""
+    tmp_path = None
     try:
-        # Check if file is present
-        if 'file' not in request.files:
+        # Stream the multipart body straight to disk instead of going through
+        # request.files; the file part may arrive before project_id, so land it
+        # in a temp file and move it once the form has been fully parsed.
+        fd, tmp_path = tempfile.mkstemp(prefix='temp_', suffix='.upload', dir=UPLOAD_FOLDER)
+        os.close(fd)
+        
+        file_target = FileTarget(tmp_path)
+        project_target = ValueTarget()
+        
+        # A body that isn't multipart (or lacks a Content-Type) carries no file
+        try:
+            parser = StreamingFormDataParser(headers=request.headers)
+            parser.register('file', file_target)
+            parser.register('project_id', project_target)
+            
+            while chunk := request.stream.read(UPLOAD_CHUNK_SIZE):
+                parser.data_received(chunk)
+        except (ParseFailedException, ValueError):
             return jsonify({'error': 'No file provided'}), 400
         
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({'error': 'No file selected'}), 400
+        # Check if file is present
+        if not file_target.multipart_filename:
+            return jsonify({'error': 'No file provided'}), 400
         
         # Get project_id from form data
-        project_id = request.form.get('project_id')
+        project_id = project_target.value.decode('utf-8').strip()
         if not project_id:
             return jsonify({'error': 'Project ID is required'}), 400
         
@@ -119,21 +260,19 @@ def upload_file():
             return jsonify({'error': 'Project not found'}), 404
         
         # Validate file extension
-        filename = secure_filename(file.filename)
-        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        filename = secure_filename(file_target.multipart_filename)
+        if not filename:
+            return jsonify({'error': 'No file selected'}), 400
+        file_ext = os.path.splitext(filename)[1][1:].lower()
         
-        if file_ext not in app.config['ALLOWED_EXTENSIONS']:
+        if not is_allowed_ext(file_ext):
             return jsonify({
-                'error': f'File type .{file_ext} not allowed. Supported types: {", ".join(app.config["ALLOWED_EXTENSIONS"])}'
+                'error': f'File type .{file_ext} not allowed. Supported types: {ALLOWED_EXT_LABEL}'
             }), 400
         
-        # Create upload directory for project
-        upload_path = os.path.join(app.config['UPLOAD_FOLDER'], str(project_id))
-        os.makedirs(upload_path, exist_ok=True)
-        
-        # Save file
-        file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
+        # Move the streamed file into the project's upload directory
+        file_path = _move_into_project_dir(tmp_path, project_id, filename)
+        tmp_path = None
         
         # Process file using DataService
         data_service = DataService()
@@ -157,36 +296,265 @@ def upload_file():
                 'message': result.get('message', 'File processing failed')
             }), 500
         
+    except RequestEntityTooLarge:
+        raise
     except Exception as e:
         app.logger.error(f"Upload file error: {str(e)}")
         return jsonify({
             'status': 'error',
             'message': f'Upload failed: {str(e)}'
         }), 500
+    finally:
+        # Drop the partial/rejected upload if it never made it into place
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+@app.route('/api/upload/batch', methods=['POST'])
+def upload_files_batch():
+    """Handle several file uploads for one project in a single request"""
+    files_target = _TempFilesTarget(UPLOAD_FOLDER)
+    try:
+        project_target = ValueTarget()
+        
+        try:
+            parser = StreamingFormDataParser(headers=request.headers)
+            parser.register('file', files_target)
+            parser.register('project_id', project_target)
+            
+            while chunk := request.stream.read(UPLOAD_CHUNK_SIZE):
+                parser.data_received(chunk)
+        except (ParseFailedException, ValueError):
+            return jsonify({'error': 'No files provided'}), 400
+        
+        if not files_target.files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        project_id = project_target.value.decode('utf-8').strip()
+        if not project_id:
+            return jsonify({'error': 'Project ID is required'}), 400
+        
+        try:
+            project_id = int(project_id)
+        except ValueError:
+            return jsonify({'error': 'Invalid project ID'}), 400
+        
+        project = db.session.get(Project, project_id)
+        if not project:
+            return jsonify({'error': 'Project not found'}), 404
+        
+        # Validate every file first, then hand the accepted ones over in one call
+        results = []
+        accepted = []
+        accepted_names = set()
+        for tmp_path, original_name in files_target.files:
+            filename = secure_filename(original_name or '')
+            file_ext = os.path.splitext(filename)[1][1:].lower()
+            
+            if not filename:
+                results.append({'filename': original_name, 'status': 'error', 'message': 'No file selected'})
+            elif filename in accepted_names:
+                # Would land on the same path and overwrite the earlier part
+                results.append({
+                    'filename': filename,
+                    'status': 'error',
+                    'message': f'Duplicate file name {filename} in this batch'
+                })
+            elif not is_allowed_ext(file_ext):
+                results.append({
+                    'filename': filename,
+                    'status': 'error',
+                    'message': f'File type .{file_ext} not allowed. Supported types: {ALLOWED_EXT_LABEL}'
+                })
+            else:
+                accepted_names.add(filename)
+                accepted.append((_move_into_project_dir(tmp_path, project_id, filename), filename))
+        
+        data_service = DataService()
+        for (file_path, filename), result in zip(accepted, data_service.process_uploaded_files(accepted, project_id)):
+            if result['status'] == 'success':
+                results.append({
+                    'filename': filename,
+                    'status': 'success',
+                    'message': f'File {filename} uploaded and processed successfully',
+                    'data_source': result.get('data_source'),
+                    'tables': result.get('tables_created', [])
+                })
+            else:
+                # Clean up file on processing failure
+                try:
+                    os.remove(file_path)
+                except OSError:
+                    pass
+                results.append({
+                    'filename': filename,
+                    'status': 'error',
+                    'message': result.get('message', 'File processing failed')
+                })
+        
+        succeeded = sum(1 for result in results if result['status'] == 'success')
+        if succeeded == len(results):
+            status = 'success'
+        elif succeeded:
+            status = 'partial'
+        else:
+            status = 'error'
+        
+        # The request itself was valid, so per-file failures are reported in the body
+        return jsonify({
+            'status': status,
+            'message': f'{succeeded} of {len(results)} files uploaded and processed successfully',
+            'results': results
+        })
+        
+    except RequestEntityTooLarge:
+        raise
+    except Exception as e:
+        app.logger.error(f"Batch upload error: {str(e)}")
+        return jsonify({
+            'status': 'error',
+            'message': f'Upload failed: {str(e)}'
+        }), 500
+    finally:
+        # Drop any temp files that were rejected or never moved into place
+        files_target.discard()
 
 
 def init_db():
     """Initialize the database"""
     with app.app_context():
         db.create_all()
-        if not User.query.filter_by(username='admin').first():
-            admin_user = User(
-                username='admin',
-                email='admin@queryforge.com',
-                role='admin',
-                is_active=True
+
+        # create_all() skips existing tables, so add any columns and indexes
+        # they're missing (new columns are all nullable)
+        inspector = db.inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    db.session.execute(db.text(
+                        f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                    ))
+        db.session.commit()
+        
+        # Msgpack columns used to be JSON text. SQLite keeps either in place;
+        # elsewhere the column becomes binary with the JSON bytes kept as-is,
+        # which Msgpack still decodes
+        dialect = db.engine.dialect.name
+        if dialect != 'sqlite':
+            for table in db.metadata.sorted_tables:
+                existing_types = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    existing_type = existing_types.get(column.name)
+                    if not isinstance(column.type, Msgpack) or existing_type is None:
+                        continue
+                    try:
+                        if existing_type.python_type is bytes:
+                            continue
+                    except NotImplementedError:
+                        continue  # type the dialect can't reflect; leave it alone
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    if dialect == 'postgresql':
+                        db.session.execute(db.text(
+                            f'ALTER TABLE {table.name} ALTER COLUMN {column.name} TYPE {column_type} '
+                            f"USING convert_to({column.name}::text, 'UTF8')"
+                        ))
+                    elif dialect in ('mysql', 'mariadb'):
+                        db.session.execute(db.text(
+                            f'ALTER TABLE {table.name} MODIFY {column.name} {column_type}'
+                        ))
+                    else:
+                        app.logger.warning(
+                            f'{table.name}.{column.name} must be converted to {column_type} by hand'
+                        )
+            db.session.commit()
+        
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        
+        # Chats created before user_query_hash existed need it for reuse lookups
+        unhashed = db.session.query(ChatHistory.id, ChatHistory.user_query).filter(
+            ChatHistory.user_query_hash.is_(None)
+        ).all()
+        if unhashed:
+            db.session.execute(db.update(ChatHistory), [
+                {'id': chat_id, 'user_query_hash': ChatHistory.hash_query(user_query)}
+                for chat_id, user_query in unhashed
+            ])
+            db.session.commit()
+        
+        # Summarize sessions that have chat rows but no chat_sessions row: all
+        # of them the first time, and any written by a worker started without
+        # this migration
+        by_session = {'partition_by': (ChatHistory.project_id, ChatHistory.session_id)}
+        ranked = db.select(
+            ChatHistory.project_id,
+            ChatHistory.session_id,
+            ChatHistory.user_query,
+            ChatHistory.created_at,
+            db.func.row_number().over(order_by=ChatHistory.created_at, **by_session).label('position'),
+            db.func.max(ChatHistory.created_at).over(**by_session).label('last_activity'),
+            db.func.count(ChatHistory.id).over(**by_session).label('query_count')
+        ).subquery()
+        summarized = db.exists().where(
+            ChatSession.project_id == ranked.c.project_id,
+            ChatSession.session_id == ranked.c.session_id
+        )
+        db.session.execute(db.insert(ChatSession).from_select(
+            ['project_id', 'session_id', 'first_query_preview', 'started_at', 'last_activity', 'query_count'],
+            db.select(
+                ranked.c.project_id,
+                ranked.c.session_id,
+                ChatSession.preview_expression(ranked.c.user_query),
+                ranked.c.created_at,
+                ranked.c.last_activity,
+                ranked.c.query_count
+            ).where(ranked.c.position == 1, ~summarized)
+        ))
+        db.session.commit()
+
+        admin_values = dict(
+            username='admin',
+            email='admin@queryforge.com',
+            role='admin',
+            is_active=True,
+            password_hash=User.hash_password('admin123')
+        )
+        dialect = db.engine.dialect.name
+        
+        if dialect in ('sqlite', 'postgresql'):
+            # Single INSERT ... ON CONFLICT DO NOTHING instead of select-then-insert
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+            
+            result = db.session.execute(
+                insert(User).values(**admin_values).on_conflict_do_nothing()
             )
-            admin_user.set_password('admin123')
-            db.session.add(admin_user)
             db.session.commit()
+            created = result.rowcount == 1
+        elif not User.query.filter_by(username='admin').first():
+            db.session.add(User(**admin_values))
+            db.session.commit()
+            created = True
+        else:
+            created = False
+        
+        if created:
             print("Default admin user created (username: admin, password: admin123)")
 
 if __name__ == '__main__':
+    # init_db is idempotent; on an existing database it applies missing
+    # columns/indexes and backfills
     if not os.path.exists('queryforge.db'):
         print("Database not found. Initializing...")
-        init_db()
-    else:
-        print("Database already exists. Skipping initialization.")
+    init_db()
 
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
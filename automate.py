@@ -2,19 +2,62 @@
 import os
 import sys
 import json
+import orjson
 import argparse
+import atexit
+import logging
+import queue
+import random
 import requests
 import time
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
 import pandas as pd
 
+log = logging.getLogger('queryforge.automate')
+
+# Keep each batch upload comfortably below the server's 100MB MAX_CONTENT_LENGTH
+BATCH_UPLOAD_MAX_BYTES = 64 * 1024 * 1024
+
+# Minimum seconds between progress lines while waiting on downloads/builds
+PROGRESS_LOG_INTERVAL = 2.0
+
+def configure_logging(log_file=None):
+    """Send log records through a queue so upload threads never block on output"""
+    formatter = logging.Formatter('%(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10240000, backupCount=10))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    
+    log_queue = queue.Queue(-1)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    
+    log.addHandler(QueueHandler(log_queue))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
 class QueryForgeAutomation:
     """Automation script for QueryForge operations"""
     
-    def __init__(self, base_url='http://localhost:5000'):
+    def __init__(self, base_url='http://localhost:5000', max_upload_workers=8):
         self.base_url = base_url.rstrip('/')
+        self.max_upload_workers = max_upload_workers
         self.session = requests.Session()
         
+        # Size the connection pool for concurrent uploads
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
     def _api_call(self, method, endpoint, **kwargs):
         """Make API call with error handling"""
         url = f"{self.base_url}/api{endpoint}"
@@ -23,18 +66,18 @@ class QueryForgeAutomation:
             response = self.session.request(method, url, **kwargs)
             
             if response.status_code >= 400:
-                print(f"❌ API Error {response.status_code}: {response.text}")
+                log.error(f"❌ API Error {response.status_code}: {response.text}")
                 return None
                 
             return response.json()
             
         except Exception as e:
-            print(f"❌ Request failed: {e}")
+            log.error(f"❌ Request failed: {e}")
             return None
     
     def create_project(self, name, description=""):
         """Create a new project"""
-        print(f"📁 Creating project: {name}")
+        log.info(f"📁 Creating project: {name}")
         
         data = {
             'name': name,
@@ -45,18 +88,18 @@ class QueryForgeAutomation:
         
         if result and result.get('status') == 'success':
             project = result['project']
-            print(f"✅ Project created: {project['name']} (ID: {project['id']})")
+            log.info(f"✅ Project created: {project['name']} (ID: {project['id']})")
             return project
         else:
-            print(f"❌ Failed to create project: {name}")
+            log.error(f"❌ Failed to create project: {name}")
             return None
     
     def upload_file(self, project_id, file_path):
         """Upload a file to a project"""
-        print(f"📤 Uploading file: {file_path}")
+        log.info(f"📤 Uploading file: {file_path}")
         
         if not os.path.exists(file_path):
-            print(f"❌ File not found: {file_path}")
+            log.error(f"❌ File not found: {file_path}")
             return None
         
         with open(file_path, 'rb') as f:
@@ -66,67 +109,117 @@ class QueryForgeAutomation:
             result = self._api_call('POST', '/upload', files=files, data=data)
         
         if result and result.get('status') == 'success':
-            print(f"✅ File uploaded successfully")
+            log.info("✅ File uploaded successfully")
             return result
         else:
-            print(f"❌ Failed to upload file: {file_path}")
+            log.error(f"❌ Failed to upload file: {file_path}")
             return None
     
+    def upload_files(self, project_id, file_paths):
+        """Upload several files to a project in one multipart request"""
+        log.info(f"📤 Uploading {len(file_paths)} files")
+        
+        with ExitStack() as stack:
+            fields = [('project_id', str(project_id))]
+            for file_path in file_paths:
+                f = stack.enter_context(open(file_path, 'rb'))
+                fields.append(('file', (os.path.basename(file_path), f)))
+            
+            # MultipartEncoder streams the files instead of building the body in memory
+            encoder = MultipartEncoder(fields=fields)
+            result = self._api_call('POST', '/upload/batch', data=encoder,
+                                    headers={'Content-Type': encoder.content_type})
+        
+        if not result:
+            log.error(f"❌ Failed to upload files: {', '.join(file_paths)}")
+            return []
+        
+        for file_result in result.get('results', []):
+            if file_result['status'] == 'success':
+                log.info(f"✅ File uploaded successfully: {file_result['filename']}")
+            else:
+                log.error(f"❌ Failed to upload file: {file_result['filename']} - {file_result.get('message')}")
+        
+        return result.get('results', [])
+    
     def generate_dictionary(self, project_id):
         """Generate data dictionary for a project"""
-        print(f"📚 Generating data dictionary for project {project_id}")
+        log.info(f"📚 Generating data dictionary for project {project_id}")
         
         result = self._api_call('POST', f'/datasources/{project_id}/generate-dictionary')
         
         if result and result.get('status') == 'success':
-            print(f"✅ Dictionary generated: {result.get('entries_created', 0)} entries")
+            log.info(f"✅ Dictionary generated: {result.get('entries_created', 0)} entries")
             return result
         else:
-            print(f"❌ Failed to generate dictionary")
+            log.error("❌ Failed to generate dictionary")
             return None
     
     def download_embedding_model(self, project_id, model_name):
         """Download an embedding model"""
-        print(f"🤖 Downloading embedding model: {model_name}")
+        log.info(f"🤖 Downloading embedding model: {model_name}")
         
         data = {'model_name': model_name}
         result = self._api_call('POST', f'/embeddings/{project_id}/models/download', json=data)
         
         if result and result.get('status') == 'success':
-            print(f"✅ Model download started: {model_name}")
+            log.info(f"✅ Model download started: {model_name}")
             return self._wait_for_model_download(project_id, model_name)
         else:
-            print(f"❌ Failed to start model download")
+            log.error("❌ Failed to start model download")
             return None
     
+    def _stream_events(self, endpoint, timeout):
+        """Yield JSON payloads from a server-sent events endpoint until timeout"""
+        url = f"{self.base_url}/api{endpoint}"
+        deadline = time.monotonic() + timeout
+        attempt = 0
+        
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                with self.session.get(url, params={'timeout': int(remaining) + 1}, stream=True,
+                                      timeout=(10, remaining + 30)) as response:
+                    if response.status_code >= 400:
+                        log.error(f"❌ API Error {response.status_code}: {response.text}")
+                        return
+                    
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and line.startswith('data: '):
+                            attempt = 0
+                            yield json.loads(line[len('data: '):])
+                            
+            except Exception as e:
+                log.error(f"❌ Event stream failed: {e}")
+            
+            # The stream dropped before a final event: reconnect with capped
+            # exponential backoff plus jitter so many clients don't retry in step
+            delay = min(30, 0.5 * 2 ** attempt) + random.uniform(0, 0.25)
+            time.sleep(max(0, min(delay, deadline - time.monotonic())))
+            attempt += 1
+    
     def _wait_for_model_download(self, project_id, model_name, timeout=300):
         """Wait for model download to complete"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            models = self._api_call('GET', f'/embeddings/{project_id}/models')
-            
-            if models and models.get('status') == 'success':
-                for model in models['models']:
-                    if model['model_name'] == model_name:
-                        if model['status'] == 'ready':
-                            print(f"✅ Model ready: {model_name}")
-                            return model
-                        elif model['status'] == 'error':
-                            print(f"❌ Model download failed: {model.get('error_message')}")
-                            return None
-                        else:
-                            progress = model.get('download_progress', 0)
-                            print(f"   Progress: {progress:.1f}%")
-            
-            time.sleep(5)
-        
-        print(f"⏰ Model download timeout: {model_name}")
+        last_progress_log = 0.0
+        for model in self._stream_events(f'/embeddings/{project_id}/models/{model_name}/events', timeout):
+            if model['status'] == 'ready':
+                log.info(f"✅ Model ready: {model_name}")
+                return model
+            elif model['status'] == 'error':
+                log.error(f"❌ Model download failed: {model.get('error_message')}")
+                return None
+            elif model['status'] == 'timeout':
+                break
+            elif time.monotonic() - last_progress_log >= PROGRESS_LOG_INTERVAL:
+                progress = model.get('download_progress', 0)
+                log.info(f"   Progress: {progress:.1f}%")
+                last_progress_log = time.monotonic()
+        
+        log.error(f"⏰ Model download timeout: {model_name}")
         return None
     
     def create_search_index(self, project_id, index_name, index_type, target_type, embedding_model_id=None):
         """Create a search index"""
-        print(f"🔍 Creating search index: {index_name}")
+        log.info(f"🔍 Creating search index: {index_name}")
         
         data = {
             'index_name': index_name,
@@ -142,40 +235,35 @@ class QueryForgeAutomation:
         result = self._api_call('POST', f'/embeddings/{project_id}/indexes', json=data)
         
         if result and result.get('status') == 'success':
-            print(f"✅ Index creation started: {index_name}")
+            log.info(f"✅ Index creation started: {index_name}")
             return self._wait_for_index_build(project_id, index_name)
         else:
-            print(f"❌ Failed to start index creation")
+            log.error("❌ Failed to start index creation")
             return None
     
     def _wait_for_index_build(self, project_id, index_name, timeout=300):
         """Wait for index build to complete"""
-        start_time = time.time()
-        
-        while time.time() - start_time < timeout:
-            indexes = self._api_call('GET', f'/embeddings/{project_id}/indexes')
-            
-            if indexes and indexes.get('status') == 'success':
-                for index in indexes['indexes']:
-                    if index['index_name'] == index_name:
-                        if index['status'] == 'ready':
-                            print(f"✅ Index ready: {index_name}")
-                            return index
-                        elif index['status'] == 'error':
-                            print(f"❌ Index build failed: {index.get('error_message')}")
-                            return None
-                        else:
-                            progress = index.get('build_progress', 0)
-                            print(f"   Progress: {progress:.1f}%")
-            
-            time.sleep(5)
-        
-        print(f"⏰ Index build timeout: {index_name}")
+        last_progress_log = 0.0
+        for index in self._stream_events(f'/embeddings/{project_id}/indexes/{index_name}/events', timeout):
+            if index['status'] == 'ready':
+                log.info(f"✅ Index ready: {index_name}")
+                return index
+            elif index['status'] == 'error':
+                log.error(f"❌ Index build failed: {index.get('error_message')}")
+                return None
+            elif index['status'] == 'timeout':
+                break
+            elif time.monotonic() - last_progress_log >= PROGRESS_LOG_INTERVAL:
+                progress = index.get('build_progress', 0)
+                log.info(f"   Progress: {progress:.1f}%")
+                last_progress_log = time.monotonic()
+        
+        log.error(f"⏰ Index build timeout: {index_name}")
         return None
     
     def run_query(self, project_id, query, method='quick'):
         """Run a natural language query"""
-        print(f"💬 Running query: {query}")
+        log.info(f"💬 Running query: {query}")
         
         data = {'query': query}
         
@@ -186,14 +274,14 @@ class QueryForgeAutomation:
             result = self._api_call('POST', f'/chat/{project_id}/query', json=data)
         
         if result and result.get('status') == 'success':
-            print(f"✅ Query completed successfully")
+            log.info("✅ Query completed successfully")
             if 'final_response' in result:
-                print(f"📋 Response: {result['final_response']}")
+                log.info(f"📋 Response: {result['final_response']}")
             if 'results' in result:
-                print(f"📊 Found {len(result['results'])} results")
+                log.info(f"📊 Found {len(result['results'])} results")
             return result
         else:
-            print(f"❌ Query failed")
+            log.error("❌ Query failed")
             return None
     
     def bulk_upload_directory(self, project_id, directory_path, file_extensions=None):
@@ -201,27 +289,53 @@ class QueryForgeAutomation:
         if file_extensions is None:
             file_extensions = ['.csv', '.xlsx', '.xls', '.json']
         
-        directory = Path(directory_path)
-        if not directory.exists():
-            print(f"❌ Directory not found: {directory_path}")
+        if not os.path.exists(directory_path):
+            log.error(f"❌ Directory not found: {directory_path}")
             return []
         
-        uploaded_files = []
-        
-        for file_path in directory.iterdir():
-            if file_path.is_file() and file_path.suffix.lower() in file_extensions:
-                result = self.upload_file(project_id, str(file_path))
-                if result:
-                    uploaded_files.append(result)
-                time.sleep(1)  # Small delay between uploads
-        
-        print(f"✅ Uploaded {len(uploaded_files)} files")
+        # scandir's is_file() uses the readdir entry type, so filtering costs no stat
+        # (except for symlinks); only the matching files are stat'ed, for their size
+        extensions = frozenset(ext.lower() for ext in file_extensions)
+        with os.scandir(directory_path) as entries:
+            candidates = [
+                (entry.path, entry.stat().st_size) for entry in entries
+                if os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file()
+            ]
+        
+        # Group files into batch requests that stay under the server's upload limit
+        batches = []
+        batch, batch_size = [], 0
+        for file_path, file_size in candidates:
+            if batch and batch_size + file_size > BATCH_UPLOAD_MAX_BYTES:
+                batches.append(batch)
+                batch, batch_size = [], 0
+            batch.append(file_path)
+            batch_size += file_size
+        if batch:
+            batches.append(batch)
+        
+        # Batches are I/O-bound, so send them concurrently and keep directory order
+        results = [None] * len(batches)
+        with ThreadPoolExecutor(max_workers=self.max_upload_workers) as executor:
+            futures = {
+                executor.submit(self.upload_files, project_id, batch): i
+                for i, batch in enumerate(batches)
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+        
+        uploaded_files = [
+            result for batch_results in results for result in batch_results
+            if result.get('status') == 'success'
+        ]
+        
+        log.info(f"✅ Uploaded {len(uploaded_files)} files")
         return uploaded_files
     
     def setup_complete_project(self, name, data_directory, description="", 
                              embedding_model='sentence-transformers/all-MiniLM-L6-v2'):
         """Complete project setup automation"""
-        print(f"🚀 Setting up complete project: {name}")
+        log.info(f"🚀 Setting up complete project: {name}")
         
         # Step 1: Create project
         project = self.create_project(name, description)
@@ -242,29 +356,32 @@ class QueryForgeAutomation:
         # Step 4: Download embedding model
         model = self.download_embedding_model(project_id, embedding_model)
         if not model:
-            print("⚠️ Continuing without embedding model")
+            log.warning("⚠️ Continuing without embedding model")
             return project
         
         # Step 5: Create search indexes
         model_id = model['id']
         
-        # Create FAISS index for tables
-        self.create_search_index(project_id, 'tables_semantic', 'faiss', 'tables', model_id)
-        time.sleep(2)
-        
-        # Create FAISS index for dictionary
-        self.create_search_index(project_id, 'dictionary_semantic', 'faiss', 'dictionary', model_id)
-        time.sleep(2)
-        
-        # Create TF-IDF index
-        self.create_search_index(project_id, 'keyword_search', 'tfidf', 'tables')
-        
-        print(f"🎉 Project setup completed: {name}")
+        # The indexes don't depend on each other, so build them concurrently
+        index_specs = [
+            ('tables_semantic', 'faiss', 'tables', model_id),       # FAISS index for tables
+            ('dictionary_semantic', 'faiss', 'dictionary', model_id),  # FAISS index for dictionary
+            ('keyword_search', 'tfidf', 'tables', None)             # TF-IDF index
+        ]
+        with ThreadPoolExecutor(max_workers=len(index_specs)) as executor:
+            futures = [
+                executor.submit(self.create_search_index, project_id, *spec)
+                for spec in index_specs
+            ]
+            for future in futures:
+                future.result()
+        
+        log.info(f"🎉 Project setup completed: {name}")
         return project
     
     def export_project_data(self, project_id, output_file):
         """Export project data to JSON"""
-        print(f"💾 Exporting project data to: {output_file}")
+        log.info(f"💾 Exporting project data to: {output_file}")
         
         export_data = {
             'project': None,
@@ -291,23 +408,27 @@ class QueryForgeAutomation:
         
         # Get chat sessions
         sessions = self._api_call('GET', f'/chat/{project_id}/sessions')
-        if sessions and sessions.get('status') == 'success':
-            for session in sessions['sessions']:
-                history = self._api_call('GET', f'/chat/{project_id}/sessions/{session["session_id"]}')
-                if history and history.get('status') == 'success':
-                    export_data['chat_history'].extend(history['chat_history'])
+        if sessions and sessions.get('status') == 'success' and sessions['sessions']:
+            session_ids = [session['session_id'] for session in sessions['sessions']]
+            history = self._api_call('POST', f'/chat/{project_id}/sessions/bulk',
+                                     json={'session_ids': session_ids})
+            if history and history.get('status') == 'success':
+                for session_id in session_ids:
+                    export_data['chat_history'].extend(history['sessions'].get(session_id, []))
         
         # Save to file
-        with open(output_file, 'w') as f:
-            json.dump(export_data, f, indent=2)
+        with open(output_file, 'wb') as f:
+            f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
         
-        print(f"✅ Export completed: {output_file}")
+        log.info(f"✅ Export completed: {output_file}")
         return export_data
 
 def main():
     parser = argparse.ArgumentParser(description='QueryForge Automation Script')
     parser.add_argument('--base-url', default='http://localhost:5000', 
                        help='Base URL of QueryForge instance')
+    parser.add_argument('--log-file', default=None,
+                       help='Also write output to this rotating log file')
     
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
@@ -350,6 +471,7 @@ def main():
         parser.print_help()
         return
     
+    configure_logging(args.log_file)
     automation = QueryForgeAutomation(args.base_url)
     
     if args.command == 'create-project':
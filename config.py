@@ -1,40 +1,90 @@
 # config.py
 import os
+import sqlite3
+import sys
+import textwrap
+from types import MappingProxyType
+from typing import Final
 from datetime import timedelta
+from functools import lru_cache
+import orjson
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+@lru_cache(maxsize=None)
+def _env(name, default=None):
+    """Read an environment variable once; the environment is fixed after start-up"""
+    return os.environ.get(name) or default
+
+_AZURE_PLACEHOLDER_KEY = 'your-azure-openai-api-key'
+_AZURE_PLACEHOLDER_ENDPOINT = 'https://your-resource.openai.azure.com/'
+
+# JSON columns are (de)serialized by the engine; orjson returns bytes, the driver wants str
+_JSON_DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+def _json_serializer(obj):
+    return orjson.dumps(obj, option=_JSON_DUMPS_OPTIONS).decode('utf-8')
 
 class Config:
     """Base configuration class"""
     
     # Basic Flask configuration
-    SECRET_KEY = os.environ.get('SECRET_KEY') or 'dev-secret-key-change-in-production'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///queryforge.db'
+    SECRET_KEY = _env('SECRET_KEY', 'dev-secret-key-change-in-production')
+    
+    # Optional werkzeug hash method override (e.g. "scrypt:65536:8:1" or
+    # "pbkdf2:sha256:600000"); unset keeps werkzeug's default
+    PASSWORD_HASH_METHOD = _env('PASSWORD_HASH_METHOD')
+    
+    SQLALCHEMY_DATABASE_URI = _env('DATABASE_URL', 'sqlite:///queryforge.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_timeout': 20,
         'pool_recycle': -1,
-        'pool_pre_ping': True
+        'pool_pre_ping': True,
+        'json_serializer': _json_serializer,
+        'json_deserializer': orjson.loads
     }
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Pooled connections move between request threads; wait on locks
+        # instead of failing fast with "database is locked"
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {'check_same_thread': False, 'timeout': 30}
     
     # File upload configuration
-    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER') or 'uploads'
+    UPLOAD_FOLDER = _env('UPLOAD_FOLDER', 'uploads')
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB max file size
-    ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls', 'json'}
+    ALLOWED_EXTENSIONS = frozenset(('csv', 'xlsx', 'xls', 'json'))
+    
+    # Response compression (Flask-Compress); streamed responses are left
+    # alone so NDJSON/backup downloads keep their first-byte latency
+    COMPRESS_MIMETYPES = ['application/json', 'text/html', 'text/css', 'application/javascript']
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_STREAMS = False
     
     # Azure OpenAI Configuration
-    LLM_CONFIG = {
-        'azure': {
-            'api_key': os.environ.get('AZURE_OPENAI_API_KEY') or 'your-azure-openai-api-key',
-            'endpoint': os.environ.get('AZURE_OPENAI_ENDPOINT') or 'https://your-resource.openai.azure.com/',
-            'api_version': os.environ.get('AZURE_OPENAI_API_VERSION') or '2024-02-01',
-            'deployment_name': os.environ.get('AZURE_OPENAI_DEPLOYMENT') or 'gpt-4',
-            'model_name': os.environ.get('AZURE_OPENAI_MODEL') or 'gpt-4',
+    LLM_CONFIG = MappingProxyType({
+        'azure': MappingProxyType({
+            'api_key': _env('AZURE_OPENAI_API_KEY', _AZURE_PLACEHOLDER_KEY),
+            'endpoint': _env('AZURE_OPENAI_ENDPOINT', _AZURE_PLACEHOLDER_ENDPOINT),
+            'api_version': _env('AZURE_OPENAI_API_VERSION', '2024-02-01'),
+            'deployment_name': _env('AZURE_OPENAI_DEPLOYMENT', 'gpt-4'),
+            'model_name': _env('AZURE_OPENAI_MODEL', 'gpt-4'),
             'max_tokens': 2000,
             'temperature': 0.1
-        }
-    }
+        })
+    })
+    
+    # Opt-in in-process cache of LLM completions keyed by a hash of the full
+    # request (deployment, messages, sampling parameters)
+    LLM_RESPONSE_CACHE = _env('CHAT_LLM_CACHE', '0') == '1'
+    LLM_RESPONSE_CACHE_SIZE = int(_env('CHAT_LLM_CACHE_SIZE', '512'))
+    LLM_RESPONSE_CACHE_TTL = 3600
+    
+    # Upper bound on in-flight LLM requests per worker process; extra callers
+    # wait for a slot instead of piling 429s onto the deployment
+    LLM_MAX_CONCURRENCY = int(_env('LLM_MAX_CONCURRENCY', '10'))
     
     # Embedding Configuration
-    EMBEDDING_CONFIG = {
+    EMBEDDING_CONFIG = MappingProxyType({
         'default_model': 'sentence-transformers/all-MiniLM-L6-v2',
         'batch_size': 32,
         'max_sequence_length': 512,
@@ -44,35 +94,32 @@ class Config:
             'sentence-transformers/distilbert-base-nli-mean-tokens',
             'sentence-transformers/paraphrase-MiniLM-L6-v2'
         ]
-    }
+    })
     
     # Entity Extraction Configuration
-    ENTITY_CONFIG = {
+    ENTITY_CONFIG = MappingProxyType({
         'similarity_threshold': 0.5,
         'max_entities': 20,
         'confidence_threshold': 0.3,
         'max_mappings_per_entity': 3
-    }
+    })
     
     # Search Configuration
-    SEARCH_CONFIG = {
+    SEARCH_CONFIG = MappingProxyType({
         'default_top_k': 10,
         'max_top_k': 100,
         'min_similarity_score': 0.1,
         'result_timeout_seconds': 30
-    }
+    })
     
     # AI Prompts
     PROMPTS = {
-        'entity_extraction': """
-Extract entities from the following natural language query that could map to database elements.
-
-Query: "{query}"
+        # Static instructions/examples go in *_system and per-request data in
+        # *_user, so every call shares an identical prefix for prompt caching
+        'entity_extraction_system': """
+You are an expert data analyst. Extract entities from queries and return valid JSON.
 
-Available database schema:
-Tables: {tables}
-Columns: {columns}
-Dictionary Terms: {dictionary_terms}
+Extract entities from the user's natural language query that could map to database elements.
 
 Please identify:
 1. Table names or concepts
@@ -87,31 +134,28 @@ Return a JSON object with an "entities" array. Each entity should have:
 - "confidence": a float between 0.0 and 1.0
 
 Example:
-{{
+{
   "entities": [
-    {{"text": "customers", "type": "table", "confidence": 0.9}},
-    {{"text": "revenue", "type": "metric", "confidence": 0.8}},
-    {{"text": "last month", "type": "filter", "confidence": 0.7}}
+    {"text": "customers", "type": "table", "confidence": 0.9},
+    {"text": "revenue", "type": "metric", "confidence": 0.8},
+    {"text": "last month", "type": "filter", "confidence": 0.7}
   ]
-}}
+}
 """,
         
-        'sql_generation': """
-Generate a SQL query based on the following information:
-
-User Query: "{query}"
-
-Extracted Entities:
-{entities}
-
-Entity Mappings:
-{mappings}
+        'entity_extraction_user': """
+Available database schema:
+Tables: {tables}
+Columns: {columns}
+Dictionary Terms: {dictionary_terms}
 
-Database Schema:
-{schema}
+Query: "{query}"
+""",
+        
+        'sql_generation_system': """
+You are an expert SQL developer. Generate safe SELECT queries and return valid JSON.
 
-Table Relationships:
-{relationships}
+Generate a SQL query based on the user query, extracted entities, entity mappings, database schema and table relationships provided.
 
 Instructions:
 1. Generate a SELECT query only
@@ -128,20 +172,35 @@ Return a JSON object with:
 - "explanation": brief explanation of the query logic
 
 Example:
-{{
+{
   "sql": "SELECT customer_name, ROUND(SUM(order_total), 2) as total_revenue FROM customers c JOIN orders o ON c.id = o.customer_id WHERE o.order_date >= DATE('now', '-30 days') GROUP BY customer_name ORDER BY total_revenue DESC LIMIT 10",
   "confidence": 0.9,
   "explanation": "Calculates total revenue per customer for the last 30 days, ordered by highest revenue first"
-}}
+}
 """,
         
-        'response_generation': """
-Generate a natural language response based on the query results.
+        'sql_generation_schema': """
+Database Schema:
+{schema}
 
-Original Query: "{query}"
-SQL Query: "{sql_query}"
-Results: {results}
-Total Results: {total_results}
+Table Relationships:
+{relationships}
+""",
+        
+        'sql_generation_user': """
+Extracted Entities:
+{entities}
+
+Entity Mappings:
+{mappings}
+
+User Query: "{query}"
+""",
+        
+        'response_generation_system': """
+You are a helpful data analyst. Provide clear, concise answers based on query results.
+
+Generate a natural language response based on the query results.
 
 Instructions:
 1. Provide a clear, conversational summary of the results
@@ -153,6 +212,14 @@ Instructions:
 7. Be concise but informative
 
 Focus on answering the user's original question directly.
+""",
+        
+        'response_generation_user': """
+SQL Query: "{sql_query}"
+Results: {results}
+Total Results: {total_results}
+
+Original Query: "{query}"
 """,
         
         'query_improvement': """
@@ -217,6 +284,27 @@ Example:
 """
     }
 
+# Normalize prompt templates once instead of on every request
+Config.PROMPTS = MappingProxyType({
+    name: sys.intern(textwrap.dedent(template).strip())
+    for name, template in Config.PROMPTS.items()
+})
+
+# Flattened hot settings; import these instead of walking the nested config
+AZURE_API_KEY: Final[str] = Config.LLM_CONFIG['azure']['api_key']
+AZURE_ENDPOINT: Final[str] = Config.LLM_CONFIG['azure']['endpoint']
+AZURE_DEPLOYMENT: Final[str] = Config.LLM_CONFIG['azure']['deployment_name']
+AZURE_API_VERSION: Final[str] = Config.LLM_CONFIG['azure']['api_version']
+LLM_MAX_CONCURRENCY: Final[int] = Config.LLM_MAX_CONCURRENCY
+EMBEDDING_DEFAULT_MODEL: Final[str] = Config.EMBEDDING_CONFIG['default_model']
+EMBEDDING_BATCH_SIZE: Final[int] = Config.EMBEDDING_CONFIG['batch_size']
+
+# Whether real Azure OpenAI credentials were supplied, resolved once at import
+_IS_AZURE_CONFIGURED = (
+    AZURE_API_KEY != _AZURE_PLACEHOLDER_KEY and
+    AZURE_ENDPOINT != _AZURE_PLACEHOLDER_ENDPOINT
+)
+
 class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
@@ -229,7 +317,8 @@ class ProductionConfig(Config):
     
     # Production-specific settings
     SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_size': 20,
+        **Config.SQLALCHEMY_ENGINE_OPTIONS,
+        'pool_size': max(10, 2 * (os.cpu_count() or 1)),
         'pool_timeout': 20,
         'pool_recycle': 300,
         'pool_pre_ping': True,
@@ -245,7 +334,7 @@ class TestingConfig(Config):
 
 def get_config():
     """Get configuration class based on environment"""
-    env = os.environ.get('FLASK_ENV', 'development').lower()
+    env = _env('FLASK_ENV', 'development').lower()
     
     if env == 'production':
         return ProductionConfig
@@ -254,28 +343,57 @@ def get_config():
     else:
         return DevelopmentConfig
 
+# Applied to every new SQLite connection: WAL lets dashboards read while chat
+# rows are being written, and NORMAL sync is safe under WAL
+_SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536'
+)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in _SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+# Working directories every worker needs (the upload folder comes from app config)
+_REQUIRED_DIRECTORIES = frozenset(('models', 'indexes', 'data', 'logs'))
+_DIRS_CREATED = set()
+
+def _ensure_directory(directory):
+    """Create a directory at most once per process"""
+    if directory in _DIRS_CREATED:
+        return
+    try:
+        # Plain mkdir skips the extra stat() that makedirs(exist_ok=True) does
+        os.mkdir(directory)
+    except FileExistsError:
+        pass
+    except FileNotFoundError:
+        os.makedirs(directory, exist_ok=True)
+    _DIRS_CREATED.add(directory)
+
 def init_app_config(app):
     """Initialize additional app configuration"""
     
     # Create required directories
-    directories = [
-        app.config['UPLOAD_FOLDER'],
-        'models',
-        'indexes', 
-        'data',
-        'logs'
-    ]
+    for directory in _REQUIRED_DIRECTORIES | {app.config['UPLOAD_FOLDER']}:
+        _ensure_directory(directory)
     
-    for directory in directories:
-        os.makedirs(directory, exist_ok=True)
+    if not event.contains(Engine, 'connect', _set_sqlite_pragmas):
+        event.listen(Engine, 'connect', _set_sqlite_pragmas)
     
     # Configure logging
     if not app.debug and not app.testing:
+        import atexit
         import logging
-        from logging.handlers import RotatingFileHandler
-        
-        if not os.path.exists('logs'):
-            os.mkdir('logs')
+        import queue
+        from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
         
         file_handler = RotatingFileHandler(
             'logs/queryforge.log', 
@@ -286,17 +404,21 @@ def init_app_config(app):
             '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
         ))
         file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
+        
+        # Request threads only enqueue records; a listener thread does the
+        # file writes and rotation
+        log_queue = queue.Queue(-1)
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+        app.extensions['log_listener'] = listener
+        
+        app.logger.addHandler(QueueHandler(log_queue))
         app.logger.setLevel(logging.INFO)
         app.logger.info('QueryForge startup')
     
     # Validate Azure OpenAI configuration
-    azure_config = app.config['LLM_CONFIG']['azure']
-    api_key = os.environ.get('AZURE_OPENAI_API_KEY') or azure_config.get('api_key')
-    endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT') or azure_config.get('endpoint')
-    
-    if (api_key == 'your-azure-openai-api-key' or 
-        endpoint == 'https://your-resource.openai.azure.com/'):
+    if not _IS_AZURE_CONFIGURED:
         app.logger.warning(
             "Azure OpenAI not configured. Chat functionality will be limited. "
             "Please set AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT environment variables."
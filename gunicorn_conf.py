@@ -0,0 +1,20 @@
+# gunicorn_conf.py
+import multiprocessing
+import os
+import subprocess
+import sys
+
+# Chat requests spend most of their time waiting on Azure OpenAI and SQLite;
+# gevent workers park those waits on greenlets instead of tying up a worker.
+# The worker applies gevent's monkey-patching itself when it boots.
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+worker_class = 'gevent'
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '1000'))
+timeout = 120
+keepalive = 5
+
+def on_starting(server):
+    """Create tables and apply column/index migrations once, before workers fork"""
+    # Separate interpreter, so the master never imports the app before forking
+    subprocess.run([sys.executable, '-c', 'from app import init_db; init_db()'], check=True)
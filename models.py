@@ -1,8 +1,71 @@
 # models.py
+from flask import current_app
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-import json
+from schemas import (
+    ProjectOut, DataSourceOut, TableInfoOut, DataDictionaryOut,
+    EmbeddingModelOut, SearchIndexOut, ChatHistoryOut, UserOut
+)
+from sqlalchemy import event
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import validates
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.ext.mutable import MutableDict, MutableList
+from sqlalchemy.types import TypeDecorator
+import hashlib
+import msgspec
+import orjson
+
+def _msgpack_enc_hook(obj):
+    # numpy scalars/arrays from pandas result sets
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    raise NotImplementedError(f"Cannot serialize {type(obj).__name__}")
+
+_msgpack_encoder = msgspec.msgpack.Encoder(enc_hook=_msgpack_enc_hook)
+_msgpack_decoder = msgspec.msgpack.Decoder()
+
+class Msgpack(TypeDecorator):
+    """Binary msgpack column for large numeric payloads; reads legacy JSON text too"""
+    impl = db.LargeBinary
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return _msgpack_encoder.encode(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str) or value[:1] in (b'[', b'{'):
+            # Row written before the column switched from JSON text (msgpack
+            # arrays and maps never start with these bytes)
+            return orjson.loads(value)
+        return _msgpack_decoder.decode(value)
+
+# JSON/msgpack columns; the Mutable wrappers flag in-place edits as dirty
+JSONDict = MutableDict.as_mutable(db.JSON)
+JSONList = MutableList.as_mutable(db.JSON)
+MsgpackDict = MutableDict.as_mutable(Msgpack)
+MsgpackList = MutableList.as_mutable(Msgpack)
+
+class utcnow(FunctionElement):
+    """Current UTC timestamp evaluated by the database"""
+    type = db.DateTime()
+    inherit_cache = True
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    return 'CURRENT_TIMESTAMP'
+
+@compiles(utcnow, 'postgresql')
+def _utcnow_postgresql(element, compiler, **kw):
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+@compiles(utcnow, 'sqlite')
+def _utcnow_sqlite(element, compiler, **kw):
+    # CURRENT_TIMESTAMP is whole seconds on SQLite; keep sub-second ordering
+    return "STRFTIME('%Y-%m-%d %H:%M:%f', 'now')"
 
 class Project(db.Model):
     __tablename__ = 'projects'
@@ -11,19 +74,26 @@ class Project(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     is_active = db.Column(db.Boolean, default=True)
     
     # Relationships
-    data_sources = db.relationship('DataSource', backref='project', lazy=True, cascade='all, delete-orphan')
-    table_infos = db.relationship('TableInfo', backref='project', lazy=True, cascade='all, delete-orphan')
+    data_sources = db.relationship('DataSource', backref='project', lazy='dynamic', cascade='all, delete-orphan')
+    table_infos = db.relationship('TableInfo', backref='project', lazy='dynamic', cascade='all, delete-orphan')
     dictionary_entries = db.relationship('DataDictionary', backref='project', lazy=True, cascade='all, delete-orphan')
     embedding_models = db.relationship('EmbeddingModel', backref='project', lazy=True, cascade='all, delete-orphan')
     search_indexes = db.relationship('SearchIndex', backref='project', lazy=True, cascade='all, delete-orphan')
     chat_sessions = db.relationship('ChatHistory', backref='project', lazy=True, cascade='all, delete-orphan')
-    
-    def to_dict(self):
+    session_summaries = db.relationship('ChatSession', backref='project', lazy=True, cascade='all, delete-orphan')
+    
+    def to_dict(self, counts=None):
+        # List views pass precomputed GROUP BY counts; otherwise run scalar COUNTs
+        if counts is None:
+            counts = {
+                'data_sources': self.data_sources.count(),
+                'tables': self.table_infos.count()
+            }
         return {
             'id': self.id,
             'name': self.name,
@@ -32,15 +102,27 @@ class Project(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'is_active': self.is_active,
-            'data_sources_count': len(self.data_sources),
-            'tables_count': len(self.table_infos)
+            'data_sources_count': counts.get('data_sources', 0),
+            'tables_count': counts.get('tables', 0)
         }
+    
+    def to_out(self, counts=None):
+        if counts is None:
+            counts = {
+                'data_sources': self.data_sources.count(),
+                'tables': self.table_infos.count()
+            }
+        return ProjectOut(
+            self.id, self.name, self.description, self.created_by,
+            self.created_at, self.updated_at, self.is_active,
+            counts.get('data_sources', 0), counts.get('tables', 0)
+        )
 
 class DataSource(db.Model):
     __tablename__ = 'data_sources'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     source_type = db.Column(db.String(20), nullable=False)  # 'file', 'database'
     file_path = db.Column(db.String(500))
@@ -50,13 +132,15 @@ class DataSource(db.Model):
     connection_config = db.Column(db.Text)  # JSON config for DB connections
     status = db.Column(db.String(20), default='active')  # active, error, processing
     error_message = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
     # Relationships
-    tables = db.relationship('TableInfo', backref='data_source', lazy=True, cascade='all, delete-orphan')
+    tables = db.relationship('TableInfo', backref='data_source', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self):
+    def to_dict(self, tables_count=None):
+        if tables_count is None:
+            tables_count = self.tables.count()
         return {
             'id': self.id,
             'project_id': self.project_id,
@@ -67,36 +151,33 @@ class DataSource(db.Model):
             'status': self.status,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'tables_count': len(self.tables)
+            'tables_count': tables_count
         }
+    
+    def to_out(self, tables_count=None):
+        if tables_count is None:
+            tables_count = self.tables.count()
+        return DataSourceOut(
+            self.id, self.project_id, self.name, self.source_type,
+            self.file_name, self.file_size, self.status, self.error_message,
+            self.created_at, tables_count
+        )
 
 class TableInfo(db.Model):
     __tablename__ = 'table_info'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    data_source_id = db.Column(db.Integer, db.ForeignKey('data_sources.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
+    data_source_id = db.Column(db.Integer, db.ForeignKey('data_sources.id'), nullable=False, index=True)
     table_name = db.Column(db.String(100), nullable=False)
     original_name = db.Column(db.String(100))  # Original sheet/table name
-    schema_info = db.Column(db.Text)  # JSON schema information
+    schema_info = db.Column(JSONDict)  # JSON schema information
     row_count = db.Column(db.Integer, default=0)
     column_count = db.Column(db.Integer, default=0)
-    sample_data = db.Column(db.Text)  # JSON sample rows
+    sample_data = db.Column(MsgpackList)  # msgpack sample rows
     description = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def get_schema(self):
-        return json.loads(self.schema_info) if self.schema_info else {}
-    
-    def set_schema(self, schema_dict):
-        self.schema_info = json.dumps(schema_dict)
-    
-    def get_sample_data(self):
-        return json.loads(self.sample_data) if self.sample_data else []
-    
-    def set_sample_data(self, data_list):
-        self.sample_data = json.dumps(data_list)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
     def to_dict(self):
         return {
@@ -105,13 +186,21 @@ class TableInfo(db.Model):
             'data_source_id': self.data_source_id,
             'table_name': self.table_name,
             'original_name': self.original_name,
-            'schema_info': self.get_schema(),
+            'schema_info': self.schema_info or {},
             'row_count': self.row_count,
             'column_count': self.column_count,
-            'sample_data': self.get_sample_data(),
+            'sample_data': self.sample_data or [],
             'description': self.description,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_out(self):
+        return TableInfoOut(
+            self.id, self.project_id, self.data_source_id, self.table_name,
+            self.original_name, self.schema_info or {}, self.row_count,
+            self.column_count, self.sample_data or [], self.description,
+            self.created_at
+        )
 
 class DataDictionary(db.Model):
     __tablename__ = 'data_dictionary'
@@ -123,32 +212,19 @@ class DataDictionary(db.Model):
     category = db.Column(db.String(50), nullable=False)  # encyclopedia, abbreviation, keyword, domain_term
     source_table = db.Column(db.String(100))
     source_column = db.Column(db.String(100))
-    aliases = db.Column(db.Text)  # JSON array of alternative terms
-    examples = db.Column(db.Text)  # JSON array of examples
-    tags = db.Column(db.Text)  # JSON array of tags
+    aliases = db.Column(JSONList)  # JSON array of alternative terms
+    examples = db.Column(JSONList)  # JSON array of examples
+    tags = db.Column(JSONList)  # JSON array of tags
     confidence_score = db.Column(db.Float, default=1.0)
     is_verified = db.Column(db.Boolean, default=False)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    
-    def get_aliases(self):
-        return json.loads(self.aliases) if self.aliases else []
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
-    def set_aliases(self, aliases_list):
-        self.aliases = json.dumps(aliases_list)
-    
-    def get_examples(self):
-        return json.loads(self.examples) if self.examples else []
-    
-    def set_examples(self, examples_list):
-        self.examples = json.dumps(examples_list)
-    
-    def get_tags(self):
-        return json.loads(self.tags) if self.tags else []
-    
-    def set_tags(self, tags_list):
-        self.tags = json.dumps(tags_list)
+    __table_args__ = (
+        db.Index('ix_dict_proj_cat_term', 'project_id', 'category', 'term'),
+        db.Index('ix_dict_term_lower', db.func.lower(term)),
+    )
     
     def to_dict(self):
         return {
@@ -159,19 +235,28 @@ class DataDictionary(db.Model):
             'category': self.category,
             'source_table': self.source_table,
             'source_column': self.source_column,
-            'aliases': self.get_aliases(),
-            'examples': self.get_examples(),
-            'tags': self.get_tags(),
+            'aliases': self.aliases or [],
+            'examples': self.examples or [],
+            'tags': self.tags or [],
             'confidence_score': round(self.confidence_score, 3) if self.confidence_score else 0.0,
             'is_verified': self.is_verified,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_out(self):
+        return DataDictionaryOut(
+            self.id, self.project_id, self.term, self.definition, self.category,
+            self.source_table, self.source_column, self.aliases or [],
+            self.examples or [], self.tags or [],
+            round(self.confidence_score, 3) if self.confidence_score else 0.0,
+            self.is_verified, self.created_at
+        )
 
 class EmbeddingModel(db.Model):
     __tablename__ = 'embedding_models'
     
     id = db.Column(db.Integer, primary_key=True)
-    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False, index=True)
     model_name = db.Column(db.String(200), nullable=False)
     model_path = db.Column(db.String(500))  # Local path to downloaded model
     model_type = db.Column(db.String(50), nullable=False)  # sentence-transformers, openai, etc.
@@ -181,8 +266,8 @@ class EmbeddingModel(db.Model):
     download_progress = db.Column(db.Float, default=0.0)
     status = db.Column(db.String(20), default='pending')  # pending, downloading, ready, error
     error_message = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
     # Relationships
     search_indexes = db.relationship('SearchIndex', backref='embedding_model', lazy=True)
@@ -201,38 +286,38 @@ class EmbeddingModel(db.Model):
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_out(self):
+        return EmbeddingModelOut(
+            self.id, self.project_id, self.model_name, self.model_type,
+            self.embedding_dimension, self.is_downloaded, self.is_active,
+            round(self.download_progress, 2) if self.download_progress else 0.0,
+            self.status, self.error_message, self.created_at
+        )
 
 class SearchIndex(db.Model):
     __tablename__ = 'search_indexes'
     
     id = db.Column(db.Integer, primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
-    embedding_model_id = db.Column(db.Integer, db.ForeignKey('embedding_models.id'), nullable=False)
+    embedding_model_id = db.Column(db.Integer, db.ForeignKey('embedding_models.id'), nullable=False, index=True)
     index_name = db.Column(db.String(100), nullable=False)
     index_type = db.Column(db.String(50), nullable=False)  # faiss, tfidf, bm25, pgvector
     target_type = db.Column(db.String(50), nullable=False)  # tables, columns, dictionary, encyclopedia
-    target_ids = db.Column(db.Text)  # JSON array of target IDs
+    target_ids = db.Column(JSONList)  # JSON array of target IDs
     index_path = db.Column(db.String(500))  # Path to saved index file
     vector_count = db.Column(db.Integer, default=0)
     is_built = db.Column(db.Boolean, default=False)
     build_progress = db.Column(db.Float, default=0.0)
     status = db.Column(db.String(20), default='pending')  # pending, building, ready, error
     error_message = db.Column(db.Text)
-    build_config = db.Column(db.Text)  # JSON config used for building
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    build_config = db.Column(JSONDict)  # JSON config used for building
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
     
-    def get_target_ids(self):
-        return json.loads(self.target_ids) if self.target_ids else []
-    
-    def set_target_ids(self, ids_list):
-        self.target_ids = json.dumps(ids_list)
-    
-    def get_build_config(self):
-        return json.loads(self.build_config) if self.build_config else {}
-    
-    def set_build_config(self, config_dict):
-        self.build_config = json.dumps(config_dict)
+    __table_args__ = (
+        db.Index('ix_search_proj_target_built', 'project_id', 'target_type', 'is_built'),
+    )
     
     def to_dict(self):
         return {
@@ -242,15 +327,25 @@ class SearchIndex(db.Model):
             'index_name': self.index_name,
             'index_type': self.index_type,
             'target_type': self.target_type,
-            'target_ids': self.get_target_ids(),
+            'target_ids': self.target_ids or [],
             'vector_count': self.vector_count,
             'is_built': self.is_built,
             'build_progress': round(self.build_progress, 2) if self.build_progress else 0.0,
             'status': self.status,
             'error_message': self.error_message,
-            'build_config': self.get_build_config(),
+            'build_config': self.build_config or {},
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_out(self):
+        return SearchIndexOut(
+            self.id, self.project_id, self.embedding_model_id, self.index_name,
+            self.index_type, self.target_type, self.target_ids or [],
+            self.vector_count, self.is_built,
+            round(self.build_progress, 2) if self.build_progress else 0.0,
+            self.status, self.error_message, self.build_config or {},
+            self.created_at
+        )
 
 class ChatHistory(db.Model):
     __tablename__ = 'chat_history'
@@ -259,49 +354,35 @@ class ChatHistory(db.Model):
     project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
     session_id = db.Column(db.String(100), nullable=False)
     user_query = db.Column(db.Text, nullable=False)
-    extracted_entities = db.Column(db.Text)  # JSON entities from LLM
-    entity_mappings = db.Column(db.Text)  # JSON mapped entities to schema
-    selected_tables = db.Column(db.Text)  # JSON selected tables and schemas
+    user_query_hash = db.Column(db.String(40))  # sha1 of user_query, set with it
+    extracted_entities = db.Column(MsgpackList)  # msgpack entities from LLM
+    entity_mappings = db.Column(MsgpackDict)  # msgpack mapped entities to schema
+    selected_tables = db.Column(JSONList)  # JSON selected tables and schemas
     generated_sql = db.Column(db.Text)
-    sql_results = db.Column(db.Text)  # JSON query results
+    sql_results = db.Column(MsgpackList)  # msgpack query results
     final_response = db.Column(db.Text)
     user_feedback = db.Column(db.Text)
-    confirmation_steps = db.Column(db.Text)  # JSON confirmation flow
+    confirmation_steps = db.Column(JSONDict)  # JSON confirmation flow
     processing_time = db.Column(db.Float)
     status = db.Column(db.String(20), default='pending')  # pending, completed, error
     error_message = db.Column(db.Text)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def get_extracted_entities(self):
-        return json.loads(self.extracted_entities) if self.extracted_entities else []
-    
-    def set_extracted_entities(self, entities_list):
-        self.extracted_entities = json.dumps(entities_list)
-    
-    def get_entity_mappings(self):
-        return json.loads(self.entity_mappings) if self.entity_mappings else {}
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     
-    def set_entity_mappings(self, mappings_dict):
-        self.entity_mappings = json.dumps(mappings_dict)
+    __table_args__ = (
+        db.Index('ix_chat_proj_session_created', 'project_id', 'session_id', 'created_at'),
+        db.Index('ix_chat_proj_session_query', 'project_id', 'session_id', 'user_query_hash'),
+    )
     
-    def get_selected_tables(self):
-        return json.loads(self.selected_tables) if self.selected_tables else []
+    @staticmethod
+    def hash_query(query):
+        """Indexable fingerprint of a query text"""
+        return hashlib.sha1(query.encode('utf-8')).hexdigest()
     
-    def set_selected_tables(self, tables_list):
-        self.selected_tables = json.dumps(tables_list)
-    
-    def get_sql_results(self):
-        return json.loads(self.sql_results) if self.sql_results else []
-    
-    def set_sql_results(self, results_list):
-        self.sql_results = json.dumps(results_list)
-    
-    def get_confirmation_steps(self):
-        return json.loads(self.confirmation_steps) if self.confirmation_steps else {}
-    
-    def set_confirmation_steps(self, steps_dict):
-        self.confirmation_steps = json.dumps(steps_dict)
+    @validates('user_query')
+    def _set_user_query_hash(self, key, value):
+        self.user_query_hash = self.hash_query(value) if value is not None else None
+        return value
     
     def to_dict(self):
         return {
@@ -309,19 +390,111 @@ class ChatHistory(db.Model):
             'project_id': self.project_id,
             'session_id': self.session_id,
             'user_query': self.user_query,
-            'extracted_entities': self.get_extracted_entities(),
-            'entity_mappings': self.get_entity_mappings(),
-            'selected_tables': self.get_selected_tables(),
+            'extracted_entities': self.extracted_entities or [],
+            'entity_mappings': self.entity_mappings or {},
+            'selected_tables': self.selected_tables or [],
             'generated_sql': self.generated_sql,
-            'sql_results': self.get_sql_results(),
+            'sql_results': self.sql_results or [],
             'final_response': self.final_response,
             'user_feedback': self.user_feedback,
-            'confirmation_steps': self.get_confirmation_steps(),
+            'confirmation_steps': self.confirmation_steps or {},
             'processing_time': round(self.processing_time, 3) if self.processing_time else 0.0,
             'status': self.status,
             'error_message': self.error_message,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_out(self):
+        return ChatHistoryOut(
+            self.id, self.project_id, self.session_id, self.user_query,
+            self.extracted_entities or [], self.entity_mappings or {},
+            self.selected_tables or [], self.generated_sql, self.sql_results or [],
+            self.final_response, self.user_feedback, self.confirmation_steps or {},
+            round(self.processing_time, 3) if self.processing_time else 0.0,
+            self.status, self.error_message, self.created_at
+        )
+
+class ChatSession(db.Model):
+    """Per-session summary of chat_history, maintained as chat rows are flushed"""
+    __tablename__ = 'chat_sessions'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    project_id = db.Column(db.Integer, db.ForeignKey('projects.id'), nullable=False)
+    session_id = db.Column(db.String(100), nullable=False)
+    first_query_preview = db.Column(db.String(103))
+    started_at = db.Column(db.DateTime)
+    last_activity = db.Column(db.DateTime)
+    query_count = db.Column(db.Integer, default=0, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('project_id', 'session_id', name='uq_chat_sessions_proj_session'),
+        db.Index('ix_chat_sessions_proj_activity', 'project_id', 'last_activity'),
+    )
+    
+    PREVIEW_LENGTH = 100
+    
+    @classmethod
+    def preview(cls, query):
+        """First query as shown in the session list"""
+        return query[:cls.PREVIEW_LENGTH] + '...' if len(query) > cls.PREVIEW_LENGTH else query
+    
+    @classmethod
+    def preview_expression(cls, query_column):
+        """SQL equivalent of preview(), for backfills"""
+        return db.case(
+            (db.func.length(query_column) > cls.PREVIEW_LENGTH,
+             db.func.substr(query_column, 1, cls.PREVIEW_LENGTH).concat('...')),
+            else_=query_column
+        )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'session_id': self.session_id,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'last_activity': self.last_activity.isoformat() if self.last_activity else None,
+            'query_count': self.query_count,
+            'first_query': self.first_query_preview or ''
+        }
+
+@event.listens_for(db.session, 'after_flush')
+def _update_chat_sessions(session, flush_context):
+    """Fold inserted and deleted chat rows into their chat_sessions summaries"""
+    added = [obj for obj in session.new if isinstance(obj, ChatHistory)]
+    deleted = [obj for obj in session.deleted if isinstance(obj, ChatHistory)]
+    if not added and not deleted:
+        return
+    
+    connection = session.connection()
+    sessions = ChatSession.__table__
+    for chat in added:
+        # created_at comes from a SQL default, so read it back in the statement
+        created_at = db.select(ChatHistory.created_at).where(ChatHistory.id == chat.id).scalar_subquery()
+        match = (sessions.c.project_id == chat.project_id) & (sessions.c.session_id == chat.session_id)
+        updated = connection.execute(
+            db.update(sessions).where(match).values(
+                query_count=sessions.c.query_count + 1,
+                last_activity=db.case(
+                    (sessions.c.last_activity < created_at, created_at),
+                    else_=sessions.c.last_activity
+                )
+            )
+        )
+        if updated.rowcount == 0:
+            connection.execute(db.insert(sessions).values(
+                project_id=chat.project_id,
+                session_id=chat.session_id,
+                first_query_preview=ChatSession.preview(chat.user_query),
+                started_at=created_at,
+                last_activity=created_at,
+                query_count=1
+            ))
+    
+    for chat in deleted:
+        match = (sessions.c.project_id == chat.project_id) & (sessions.c.session_id == chat.session_id)
+        connection.execute(db.update(sessions).where(match).values(query_count=sessions.c.query_count - 1))
+        connection.execute(db.delete(sessions).where(match, sessions.c.query_count <= 0))
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -333,17 +506,27 @@ class User(db.Model):
     role = db.Column(db.String(20), default='user')  # admin, user, viewer
     is_active = db.Column(db.Boolean, default=True)
     last_login = db.Column(db.DateTime)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=utcnow(), server_default=utcnow())
     
     # Relationships
     projects = db.relationship('Project', backref='creator', lazy=True)
     chat_history = db.relationship('ChatHistory', backref='user', lazy=True)
     dictionary_entries = db.relationship('DataDictionary', backref='creator', lazy=True)
     
+    # werkzeug.security is only needed for auth, so import it on first use
+    @staticmethod
+    def hash_password(password):
+        from werkzeug.security import generate_password_hash
+        method = current_app.config.get('PASSWORD_HASH_METHOD')
+        if method:
+            return generate_password_hash(password, method=method)
+        return generate_password_hash(password)
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = User.hash_password(password)
     
     def check_password(self, password):
+        from werkzeug.security import check_password_hash
         return check_password_hash(self.password_hash, password)
     
     def to_dict(self):
@@ -355,4 +538,10 @@ class User(db.Model):
             'is_active': self.is_active,
             'last_login': self.last_login.isoformat() if self.last_login else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+    
+    def to_out(self):
+        return UserOut(
+            self.id, self.username, self.email, self.role, self.is_active,
+            self.last_login, self.created_at
+        )
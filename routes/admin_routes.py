@@ -1,15 +1,213 @@
 # routes/admin_routes.py
-from flask import Blueprint, request, jsonify, current_app
-from models import db, Project, DataSource, TableInfo, DataDictionary, EmbeddingModel, SearchIndex, ChatHistory, User
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models import db, Project, DataSource, TableInfo, DataDictionary, EmbeddingModel, SearchIndex, ChatHistory, ChatSession, User
 from services.search_service import SearchService
+from schemas import json_response
+import msgspec
 import sqlite3
 import os
+import pathlib
+import re
 import psutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing
 from datetime import datetime, timedelta
-import json
+from types import MappingProxyType
+import orjson
 
 admin_bp = Blueprint('admin', __name__)
 
+# SearchService builds an EmbeddingService; admin views only need it for
+# project database paths, so one instance is shared per process
+_search_service = None
+
+def _get_search_service():
+    """Return the shared SearchService, creating it on first use"""
+    global _search_service
+    if _search_service is None:
+        _search_service = SearchService()
+    return _search_service
+
+# Tables of the application database, in the order the admin views list them
+SYSTEM_TABLES = (
+    ('projects', Project),
+    ('data_sources', DataSource),
+    ('table_info', TableInfo),
+    ('data_dictionary', DataDictionary),
+    ('embedding_models', EmbeddingModel),
+    ('search_indexes', SearchIndex),
+    ('chat_history', ChatHistory),
+    ('chat_sessions', ChatSession),
+    ('users', User)
+)
+SYSTEM_TABLE_MODELS = MappingProxyType(dict(SYSTEM_TABLES))
+
+# Statements that need confirm_dangerous before /sql/execute runs them
+DANGEROUS_SQL_PATTERN = re.compile(r'\b(DROP|TRUNCATE|DELETE|UPDATE|INSERT|ALTER|CREATE|EXEC)\b')
+
+# Project databases are read through a 256MB memory map
+PROJECT_DB_MMAP_SIZE = 256 * 1024 * 1024
+
+# Pooled connections outlive requests, so give their prepared-statement
+# caches room for the fixed per-table statements of every browsed table
+PROJECT_DB_STATEMENT_CACHE = 256
+
+# Project table names are generated by the upload pipeline as plain identifiers
+TABLE_NAME_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+# Each worker thread keeps up to PROJECT_DB_POOL_SIZE project connections open,
+# closing the least recently used one when a new database is touched. Under
+# gevent the patched threading.local is per greenlet (i.e. per request), so the
+# pool is keyed on the unpatched native thread and shared by its greenlets.
+# Pooled connections are only used synchronously inside a view; streamed
+# results read from a connection of their own
+PROJECT_DB_POOL_SIZE = 32
+try:
+    from gevent import monkey
+    _project_connections = monkey.get_original('threading', 'local')()
+except ImportError:
+    _project_connections = threading.local()
+
+# SQLite caps compound SELECTs at 500 terms by default
+COUNT_UNION_BATCH = 400
+
+# VACUUM rewrites whole files, so project databases are optimized in parallel
+OPTIMIZE_MAX_WORKERS = 4
+
+# Ad-hoc SELECTs without a LIMIT are capped unless the request sets force,
+# and full scans of tables larger than SQL_SCAN_WARN_ROWS are reported
+SQL_AUTO_LIMIT = 10000
+SQL_SCAN_WARN_ROWS = 100000
+LIMIT_PATTERN = re.compile(r'\bLIMIT\b')
+FULL_SCAN_PATTERN = re.compile(r'SCAN (?:TABLE )?(\w+)')
+
+# Rows fetched per round trip when streaming ad-hoc SELECT results
+SQL_STREAM_BATCH_SIZE = 1000
+
+# Rows fetched per round trip when streaming tables into a backup
+BACKUP_BATCH_SIZE = 1000
+
+# Backups are many small record writes; flush them to disk in 1MB chunks
+BACKUP_WRITE_BUFFER = 1 << 20
+
+# COUNT(*) is a full scan on SQLite and admin pages don't need exact numbers,
+# so row counts are reused for COUNT_CACHE_TTL seconds. Keys are
+# (db_key, table_name); db_key is SYSTEM_DB_KEY or a project database path
+# and table_name '*' holds a whole-database count listing.
+COUNT_CACHE_TTL = 30
+SYSTEM_DB_KEY = 'system'
+_count_cache = {}
+_count_cache_lock = threading.Lock()
+
+def _get_cached_count(key, fetch_fn, ttl=COUNT_CACHE_TTL):
+    """Return a cached count for key, calling fetch_fn on a miss or expiry"""
+    now = time.monotonic()
+    with _count_cache_lock:
+        cached = _count_cache.get(key)
+    if cached and cached[1] > now:
+        return cached[0]
+    
+    count = fetch_fn()
+    with _count_cache_lock:
+        _count_cache[key] = (count, now + ttl)
+    return count
+
+def _invalidate_counts(db_key):
+    """Drop every cached count for a database after a write"""
+    with _count_cache_lock:
+        for key in [key for key in _count_cache if key[0] == db_key]:
+            del _count_cache[key]
+
+def _ro_connect(db_path):
+    """Open a project database read-only and memory-mapped for the read endpoints"""
+    conn = sqlite3.connect(
+        f"{pathlib.Path(db_path).resolve().as_uri()}?mode=ro", uri=True,
+        check_same_thread=False, cached_statements=PROJECT_DB_STATEMENT_CACHE
+    )
+    conn.execute('PRAGMA query_only=1')
+    conn.execute(f'PRAGMA mmap_size={PROJECT_DB_MMAP_SIZE}')
+    return conn
+
+def _get_conn(db_path, readonly=True):
+    """Return this thread's pooled connection to a project database"""
+    pool = getattr(_project_connections, 'pool', None)
+    if pool is None:
+        pool = _project_connections.pool = OrderedDict()
+    
+    key = (db_path, readonly)
+    conn = pool.get(key)
+    if conn is not None:
+        pool.move_to_end(key)
+        return conn
+    
+    if readonly:
+        conn = _ro_connect(db_path)
+    else:
+        conn = sqlite3.connect(
+            db_path, check_same_thread=False, cached_statements=PROJECT_DB_STATEMENT_CACHE
+        )
+    pool[key] = conn
+    if len(pool) > PROJECT_DB_POOL_SIZE:
+        _, evicted = pool.popitem(last=False)
+        evicted.close()
+    return conn
+
+def _quote_identifier(name):
+    """Quote a SQLite identifier taken from sqlite_master"""
+    return '"' + name.replace('"', '""') + '"'
+
+def _record_serializer(model_class, ids=None):
+    """record -> dict for a system table, with project/data source child counts from one GROUP BY each"""
+    if model_class not in (Project, DataSource):
+        return model_class.to_dict
+    
+    def grouped_counts(child, key):
+        query = db.session.query(key, db.func.count(child.id))
+        if ids is not None:
+            query = query.filter(key.in_(ids))
+        return dict(query.group_by(key).all())
+    
+    if model_class is Project:
+        data_source_counts = grouped_counts(DataSource, DataSource.project_id)
+        table_counts = grouped_counts(TableInfo, TableInfo.project_id)
+        return lambda record: record.to_dict(counts={
+            'data_sources': data_source_counts.get(record.id, 0),
+            'tables': table_counts.get(record.id, 0)
+        })
+    
+    table_counts = grouped_counts(TableInfo, TableInfo.data_source_id)
+    return lambda record: record.to_dict(tables_count=table_counts.get(record.id, 0))
+
+def _query_system_table_counts():
+    """Row counts for every system table in one UNION ALL query"""
+    counts_query = db.union_all(*[
+        db.select(db.literal(table_name), db.func.count()).select_from(model_class)
+        for table_name, model_class in SYSTEM_TABLES
+    ])
+    return dict(db.session.execute(counts_query).all())
+
+def _system_table_counts():
+    """Cached {table_name: row_count} for the system tables, shared by the admin views"""
+    return _get_cached_count((SYSTEM_DB_KEY, '*'), _query_system_table_counts)
+
+def _project_table_counts(cursor):
+    """(table_name, row_count) for every table in a project database"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+    table_names = [row[0] for row in cursor.fetchall()]
+    
+    counts = []
+    for start in range(0, len(table_names), COUNT_UNION_BATCH):
+        batch = table_names[start:start + COUNT_UNION_BATCH]
+        cursor.execute(
+            " UNION ALL ".join(f"SELECT ?, COUNT(*) FROM {_quote_identifier(name)}" for name in batch),
+            batch
+        )
+        counts.extend(cursor.fetchall())
+    return counts
+
 @admin_bp.route('/tables', methods=['GET'])
 def get_all_tables():
     """Get all database tables with pagination"""
@@ -21,27 +219,18 @@ def get_all_tables():
         tables_info = []
         
         # System tables
-        system_tables = [
-            ('projects', Project),
-            ('data_sources', DataSource),
-            ('table_info', TableInfo),
-            ('data_dictionary', DataDictionary),
-            ('embedding_models', EmbeddingModel),
-            ('search_indexes', SearchIndex),
-            ('chat_history', ChatHistory),
-            ('users', User)
-        ]
-        
-        for table_name, model_class in system_tables:
-            try:
-                count = model_class.query.count()
+        try:
+            system_counts = _system_table_counts()
+            for table_name, model_class in SYSTEM_TABLES:
                 tables_info.append({
                     'name': table_name,
                     'type': 'system',
-                    'row_count': count,
+                    'row_count': system_counts.get(table_name, 0),
                     'model': model_class.__name__
                 })
-            except Exception as e:
+        except Exception as e:
+            db.session.rollback()
+            for table_name, model_class in SYSTEM_TABLES:
                 tables_info.append({
                     'name': table_name,
                     'type': 'system',
@@ -53,21 +242,16 @@ def get_all_tables():
         projects = Project.query.all()
         for project in projects:
             try:
-                search_service = SearchService()
+                search_service = _get_search_service()
                 db_path = search_service._get_project_db_path(project.id)
                 
                 if os.path.exists(db_path):
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
+                    cursor = _get_conn(db_path).cursor()
                     
-                    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-                    user_tables = cursor.fetchall()
-                    
-                    for table in user_tables:
-                        table_name = table[0]
-                        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-                        row_count = cursor.fetchone()[0]
-                        
+                    project_counts = _get_cached_count(
+                        (db_path, '*'), lambda: _project_table_counts(cursor)
+                    )
+                    for table_name, row_count in project_counts:
                         tables_info.append({
                             'name': f"{project.name}.{table_name}",
                             'type': 'user_data',
@@ -76,8 +260,6 @@ def get_all_tables():
                             'project_name': project.name,
                             'table_name': table_name
                         })
-                    
-                    conn.close()
             except Exception as e:
                 current_app.logger.error(f"Error reading project {project.id} database: {str(e)}")
         
@@ -106,10 +288,17 @@ def get_all_tables():
 
 @admin_bp.route('/tables/<table_name>/data', methods=['GET'])
 def get_table_data(table_name):
-    """Get data from a specific table"""
+    """Get data from a specific table
+
+    Passing after_rowid switches to keyset pagination: rows are read with
+    WHERE rowid > ? instead of OFFSET, so deep pages cost the same as the
+    first one, but pages can only be walked forward via next_cursor.
+    """
     try:
         page = request.args.get('page', 1, type=int)
         per_page = min(request.args.get('per_page', 50, type=int), 1000)
+        after_rowid = request.args.get('after_rowid', type=int)
+        next_cursor = None
         
         # Check if it's a system table or user data table
         if '.' in table_name:
@@ -120,68 +309,87 @@ def get_table_data(table_name):
             if not project:
                 return jsonify({'error': 'Project not found'}), 404
             
-            search_service = SearchService()
+            search_service = _get_search_service()
             db_path = search_service._get_project_db_path(project.id)
             
             if not os.path.exists(db_path):
                 return jsonify({'error': 'Project database not found'}), 404
             
-            conn = sqlite3.connect(db_path)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
+            if not TABLE_NAME_PATTERN.fullmatch(actual_table_name):
+                return jsonify({'error': 'Invalid table name'}), 400
             
-            # Get total count
-            cursor.execute(f"SELECT COUNT(*) as count FROM {actual_table_name}")
-            total_count = cursor.fetchone()['count']
+            cursor = _get_conn(db_path).cursor()
+            cursor.arraysize = per_page
             
-            # Get paginated data
-            offset = (page - 1) * per_page
-            cursor.execute(f"SELECT * FROM {actual_table_name} LIMIT ? OFFSET ?", (per_page, offset))
-            rows = cursor.fetchall()
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (actual_table_name,)
+            )
+            if cursor.fetchone() is None:
+                return jsonify({'error': 'Table not found'}), 404
+            quoted_table = _quote_identifier(actual_table_name)
             
-            data = [dict(row) for row in rows]
-            columns = list(data[0].keys()) if data else []
+            # Get total count
+            def count_rows():
+                cursor.execute(f"SELECT COUNT(*) FROM {quoted_table}")
+                return cursor.fetchone()[0]
+            total_count = _get_cached_count((db_path, actual_table_name), count_rows)
             
-            conn.close()
+            # Get paginated data
+            if after_rowid is not None:
+                cursor.execute(
+                    f"SELECT rowid AS _keyset_rowid, * FROM {quoted_table} "
+                    f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (after_rowid, per_page)
+                )
+                keyed_rows = cursor.fetchmany(per_page)
+                if len(keyed_rows) == per_page:
+                    next_cursor = keyed_rows[-1][0]
+                rows = [row[1:] for row in keyed_rows]
+                columns = [column[0] for column in cursor.description[1:]]
+            else:
+                offset = (page - 1) * per_page
+                cursor.execute(f"SELECT * FROM {quoted_table} LIMIT ? OFFSET ?", (per_page, offset))
+                rows = cursor.fetchmany(per_page)
+                columns = [column[0] for column in cursor.description]
             
         else:
             # System table
-            model_map = {
-                'projects': Project,
-                'data_sources': DataSource,
-                'table_info': TableInfo,
-                'data_dictionary': DataDictionary,
-                'embedding_models': EmbeddingModel,
-                'search_indexes': SearchIndex,
-                'chat_history': ChatHistory,
-                'users': User
-            }
-            
-            if table_name not in model_map:
+            model_class = SYSTEM_TABLE_MODELS.get(table_name)
+            if model_class is None:
                 return jsonify({'error': 'Table not found'}), 404
             
-            model_class = model_map[table_name]
-            
             # Get total count
-            total_count = model_class.query.count()
+            total_count = _get_cached_count((SYSTEM_DB_KEY, table_name), model_class.query.count)
             
             # Get paginated data
-            offset = (page - 1) * per_page
-            records = model_class.query.offset(offset).limit(per_page).all()
+            if after_rowid is not None:
+                records = model_class.query.filter(
+                    model_class.id > after_rowid
+                ).order_by(model_class.id).limit(per_page).all()
+                if len(records) == per_page:
+                    next_cursor = records[-1].id
+            else:
+                offset = (page - 1) * per_page
+                records = model_class.query.offset(offset).limit(per_page).all()
             
-            data = [record.to_dict() for record in records]
+            to_dict = _record_serializer(model_class, [record.id for record in records])
+            data = [to_dict(record) for record in records]
             columns = list(data[0].keys()) if data else []
+            rows = [list(record.values()) for record in data]
         
-        return jsonify({
+        # Rows go out as positional arrays under a single columns header
+        return json_response({
             'status': 'success',
             'table_name': table_name,
-            'data': data,
             'columns': columns,
+            'rows': rows,
             'pagination': {
                 'page': page,
                 'per_page': per_page,
                 'total': total_count,
-                'pages': (total_count + per_page - 1) // per_page
+                'pages': (total_count + per_page - 1) // per_page,
+                'after_rowid': after_rowid,
+                'next_cursor': next_cursor
             }
         })
         
@@ -189,6 +397,49 @@ def get_table_data(table_name):
         current_app.logger.error(f"Get table data error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _full_scan_warnings(plan_rows, table_row_count):
+    """Warn about full scans of large tables in an EXPLAIN QUERY PLAN result"""
+    warnings = []
+    for plan_row in plan_rows:
+        match = FULL_SCAN_PATTERN.match(plan_row[-1])
+        if not match:
+            continue
+        table_name = match.group(1)
+        try:
+            row_count = table_row_count(table_name)
+        except Exception:
+            continue
+        if row_count > SQL_SCAN_WARN_ROWS:
+            warnings.append(f"Full scan of {table_name} ({row_count} rows); add a WHERE clause on an indexed column")
+    return warnings
+
+def _stream_select(fetchmany, columns, extra, max_rows=None):
+    """Stream a SELECT result as JSON, fetching SQL_STREAM_BATCH_SIZE rows at a time"""
+    def generate():
+        header = {'status': 'success', 'execution_type': 'SELECT', 'columns': columns, **extra}
+        yield msgspec.json.encode(header)[:-1] + b',"rows":['
+        
+        row_count = 0
+        while max_rows is None or row_count < max_rows:
+            batch_size = SQL_STREAM_BATCH_SIZE
+            if max_rows is not None:
+                batch_size = min(batch_size, max_rows - row_count)
+            batch = fetchmany(batch_size)
+            if not batch:
+                break
+            if row_count:
+                yield b','
+            yield msgspec.json.encode([tuple(row) for row in batch])[1:-1]
+            row_count += len(batch)
+        
+        footer = {
+            'row_count': row_count,
+            'message': f'Query executed successfully. {row_count} rows returned.'
+        }
+        yield b'],' + msgspec.json.encode(footer)[1:]
+    
+    return Response(stream_with_context(generate()), mimetype='application/json')
+
 @admin_bp.route('/sql/execute', methods=['POST'])
 def execute_sql():
     """Execute SQL query with syntax highlighting support"""
@@ -208,8 +459,8 @@ def execute_sql():
         sql_upper = sql_query.upper()
         
         # Check for dangerous operations
-        dangerous_keywords = ['DROP', 'TRUNCATE', 'DELETE', 'UPDATE', 'INSERT', 'ALTER', 'CREATE', 'EXEC']
-        is_dangerous = any(keyword in sql_upper for keyword in dangerous_keywords)
+        dangerous_operations = list(dict.fromkeys(DANGEROUS_SQL_PATTERN.findall(sql_upper)))
+        is_dangerous = bool(dangerous_operations)
         
         if is_dangerous:
             confirm_dangerous = data.get('confirm_dangerous', False)
@@ -217,30 +468,37 @@ def execute_sql():
                 return jsonify({
                     'status': 'warning',
                     'message': 'This query contains potentially dangerous operations. Confirm to execute.',
-                    'dangerous_operations': [kw for kw in dangerous_keywords if kw in sql_upper],
+                    'dangerous_operations': dangerous_operations,
                     'requires_confirmation': True
                 }), 200
         
+        # Cap unbounded SELECTs unless the client explicitly forces them; rows are
+        # fetched lazily, so the cap is applied while streaming instead of by
+        # rewriting SQL that may end in a comment or semicolon
+        is_select = sql_upper.startswith('SELECT')
+        auto_limit = None
+        if is_select and not data.get('force', False) and not LIMIT_PATTERN.search(sql_upper):
+            auto_limit = SQL_AUTO_LIMIT
+        
         # Execute query
         if target_db == 'system':
             # Execute on system database
+            scan_warnings = []
+            if is_select and db.engine.dialect.name == 'sqlite':
+                plan_rows = db.session.execute(db.text(f"EXPLAIN QUERY PLAN {sql_query}")).all()
+                system_counts = _system_table_counts()
+                scan_warnings = _full_scan_warnings(plan_rows, lambda name: system_counts.get(name, 0))
+            
             result = db.session.execute(sql_query)
             
-            if sql_upper.startswith('SELECT'):
-                rows = result.fetchall()
-                data_list = [dict(row) for row in rows]
-                columns = list(data_list[0].keys()) if data_list else []
-                
-                return jsonify({
-                    'status': 'success',
-                    'message': f'Query executed successfully. {len(data_list)} rows returned.',
-                    'data': data_list,
-                    'columns': columns,
-                    'row_count': len(data_list),
-                    'execution_type': 'SELECT'
-                })
+            if is_select:
+                return _stream_select(result.fetchmany, list(result.keys()), {
+                    'auto_limit': auto_limit,
+                    'warnings': scan_warnings
+                }, max_rows=auto_limit)
             else:
                 db.session.commit()
+                _invalidate_counts(SYSTEM_DB_KEY)
                 return jsonify({
                     'status': 'success',
                     'message': f'Query executed successfully. {result.rowcount} rows affected.',
@@ -254,38 +512,47 @@ def execute_sql():
                 project_id = int(target_db)
                 project = Project.query.get_or_404(project_id)
                 
-                search_service = SearchService()
+                search_service = _get_search_service()
                 db_path = search_service._get_project_db_path(project_id)
                 
                 if not os.path.exists(db_path):
                     return jsonify({'error': 'Project database not found'}), 404
                 
-                conn = sqlite3.connect(db_path)
-                conn.row_factory = sqlite3.Row
+                conn = _get_conn(db_path, readonly=is_select)
                 cursor = conn.cursor()
                 
-                cursor.execute(sql_query)
-                
-                if sql_upper.startswith('SELECT'):
-                    rows = cursor.fetchall()
-                    data_list = [dict(row) for row in rows]
-                    columns = list(data_list[0].keys()) if data_list else []
-                    
-                    conn.close()
+                if is_select:
+                    def project_table_count(name):
+                        return _get_cached_count(
+                            (db_path, name),
+                            lambda: conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(name)}").fetchone()[0]
+                        )
+                    plan_rows = conn.execute(f"EXPLAIN QUERY PLAN {sql_query}").fetchall()
+                    scan_warnings = _full_scan_warnings(plan_rows, project_table_count)
                     
-                    return jsonify({
-                        'status': 'success',
-                        'message': f'Query executed successfully. {len(data_list)} rows returned.',
-                        'data': data_list,
-                        'columns': columns,
-                        'row_count': len(data_list),
-                        'execution_type': 'SELECT',
-                        'target_project': project.name
-                    })
+                    # The rows are read after this view returns, so they get their own
+                    # connection: a pooled one could be evicted and closed by another
+                    # request (another greenlet under gevent) mid-stream
+                    stream_conn = _ro_connect(db_path)
+                    try:
+                        stream_cursor = stream_conn.execute(sql_query)
+                    except Exception:
+                        stream_conn.close()
+                        raise
+                    columns = [column[0] for column in stream_cursor.description] if stream_cursor.description else []
+                    response = _stream_select(stream_cursor.fetchmany, columns, {
+                        'target_project': project.name,
+                        'auto_limit': auto_limit,
+                        'warnings': scan_warnings
+                    }, max_rows=auto_limit)
+                    response.call_on_close(stream_conn.close)
+                    return response
                 else:
-                    conn.commit()
+                    # Commit or roll back so the pooled connection is left clean
+                    with conn:
+                        cursor.execute(sql_query)
                     affected_rows = cursor.rowcount
-                    conn.close()
+                    _invalidate_counts(db_path)
                     
                     return jsonify({
                         'status': 'success',
@@ -304,36 +571,111 @@ def execute_sql():
         current_app.logger.error(f"Execute SQL error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _dir_size(path):
+    """Total size of files under path, using the stat cached on each DirEntry"""
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total += _dir_size(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+# Storage folders change rarely, so their sizes are served from a snapshot
+# and recomputed on a background thread once it is older than the TTL
+STORAGE_CACHE_TTL = 60
+_storage_cache = {'data': None, 'ts': 0.0, 'refreshing': False}
+_storage_cache_lock = threading.Lock()
+
+def _compute_storage_usage(folders):
+    """Measure each (name, path) folder"""
+    storage_usage = {}
+    for folder_name, folder_path in folders:
+        try:
+            if os.path.exists(folder_path):
+                total_size = _dir_size(folder_path)
+                storage_usage[folder_name] = {
+                    'size_bytes': total_size,
+                    'size_mb': round(total_size / (1024 * 1024), 2)
+                }
+            else:
+                storage_usage[folder_name] = {'size_bytes': 0, 'size_mb': 0}
+        except:
+            storage_usage[folder_name] = {'size_bytes': 0, 'size_mb': 0}
+    return storage_usage
+
+def _refresh_storage_usage(folders):
+    """Recompute folder sizes and swap in the new snapshot"""
+    try:
+        storage_usage = _compute_storage_usage(folders)
+        with _storage_cache_lock:
+            _storage_cache['data'] = storage_usage
+            _storage_cache['ts'] = time.monotonic()
+    finally:
+        with _storage_cache_lock:
+            _storage_cache['refreshing'] = False
+
+def _get_storage_usage(folders):
+    """Return cached folder sizes, refreshing them in the background when stale"""
+    with _storage_cache_lock:
+        storage_usage = _storage_cache['data']
+        stale = time.monotonic() - _storage_cache['ts'] >= STORAGE_CACHE_TTL
+        start_refresh = stale and not _storage_cache['refreshing']
+        if start_refresh:
+            _storage_cache['refreshing'] = True
+    
+    if start_refresh:
+        if storage_usage is None:
+            # Nothing to serve yet; measure inline once
+            _refresh_storage_usage(folders)
+            return _storage_cache['data']
+        threading.Thread(target=_refresh_storage_usage, args=(folders,), daemon=True).start()
+    
+    return storage_usage if storage_usage is not None else _compute_storage_usage(folders)
+
+# CPU, memory and disk are sampled by a daemon thread so the health endpoint
+# never blocks on psutil.cpu_percent's measuring interval
+SYSTEM_SAMPLE_INTERVAL = 5.0
+_system_sample = None
+_system_sampler_lock = threading.Lock()
+
+def _sample_system_metrics():
+    """Refresh the shared system sample forever"""
+    global _system_sample
+    while True:
+        cpu_percent = psutil.cpu_percent(interval=SYSTEM_SAMPLE_INTERVAL)
+        _system_sample = (cpu_percent, psutil.virtual_memory(), psutil.disk_usage('/'))
+
+def _get_system_sample():
+    """Return the latest (cpu_percent, memory, disk), starting the sampler on first use"""
+    global _system_sample
+    if _system_sample is None:
+        with _system_sampler_lock:
+            if _system_sample is None:
+                # Prime the CPU counter; the first non-blocking reading is 0.0
+                _system_sample = (
+                    psutil.cpu_percent(interval=None), psutil.virtual_memory(), psutil.disk_usage('/')
+                )
+                threading.Thread(target=_sample_system_metrics, daemon=True).start()
+    return _system_sample
+
 @admin_bp.route('/system/health', methods=['GET'])
 def get_system_health():
     """Get system health and performance metrics"""
     try:
         # System metrics
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        cpu_percent, memory, disk = _get_system_sample()
         
         # Database metrics
         db_stats = {}
         
         # System database stats
-        system_tables = [
-            ('projects', Project),
-            ('data_sources', DataSource),
-            ('table_info', TableInfo),
-            ('data_dictionary', DataDictionary),
-            ('embedding_models', EmbeddingModel),
-            ('search_indexes', SearchIndex),
-            ('chat_history', ChatHistory),
-            ('users', User)
-        ]
-        
-        for table_name, model_class in system_tables:
-            try:
-                count = model_class.query.count()
-                db_stats[table_name] = count
-            except:
-                db_stats[table_name] = 0
+        try:
+            db_stats.update(_system_table_counts())
+        except:
+            db.session.rollback()
+            db_stats = {table_name: 0 for table_name, _ in SYSTEM_TABLES}
         
         # Project databases stats
         projects = Project.query.all()
@@ -341,7 +683,7 @@ def get_system_health():
         
         for project in projects:
             try:
-                search_service = SearchService()
+                search_service = _get_search_service()
                 db_path = search_service._get_project_db_path(project.id)
                 
                 if os.path.exists(db_path):
@@ -356,17 +698,20 @@ def get_system_health():
         # Application metrics
         uptime = datetime.utcnow() - datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
         
-        # Recent activity
+        # Recent activity: last-day queries and last-hour distinct sessions
+        # come from one conditional aggregate over the last day's rows
+        now = datetime.utcnow()
+        recent_queries, active_sessions = db.session.query(
+            db.func.count(ChatHistory.id),
+            db.func.count(db.distinct(db.case(
+                (ChatHistory.created_at >= now - timedelta(hours=1), ChatHistory.session_id)
+            )))
+        ).filter(ChatHistory.created_at >= now - timedelta(hours=24)).one()
+        
         recent_activity = {
             'recent_projects': Project.query.order_by(Project.created_at.desc()).limit(5).count(),
-            'recent_queries': ChatHistory.query.filter(
-                ChatHistory.created_at >= datetime.utcnow() - timedelta(hours=24)
-            ).count(),
-            'active_sessions': len(set(
-                chat.session_id for chat in ChatHistory.query.filter(
-                    ChatHistory.created_at >= datetime.utcnow() - timedelta(hours=1)
-                ).all()
-            ))
+            'recent_queries': recent_queries,
+            'active_sessions': active_sessions
         }
         
         # Storage usage
@@ -374,23 +719,9 @@ def get_system_health():
         models_folder = 'models'
         indexes_folder = 'indexes'
         
-        storage_usage = {}
-        for folder_name, folder_path in [('uploads', upload_folder), ('models', models_folder), ('indexes', indexes_folder)]:
-            try:
-                if os.path.exists(folder_path):
-                    total_size = sum(
-                        os.path.getsize(os.path.join(dirpath, filename))
-                        for dirpath, dirnames, filenames in os.walk(folder_path)
-                        for filename in filenames
-                    )
-                    storage_usage[folder_name] = {
-                        'size_bytes': total_size,
-                        'size_mb': round(total_size / (1024 * 1024), 2)
-                    }
-                else:
-                    storage_usage[folder_name] = {'size_bytes': 0, 'size_mb': 0}
-            except:
-                storage_usage[folder_name] = {'size_bytes': 0, 'size_mb': 0}
+        storage_usage = _get_storage_usage(
+            (('uploads', upload_folder), ('models', models_folder), ('indexes', indexes_folder))
+        )
         
         health_status = {
             'system': {
@@ -458,9 +789,9 @@ def get_users():
     try:
         users = User.query.all()
         
-        return jsonify({
+        return json_response({
             'status': 'success',
-            'users': [user.to_dict() for user in users]
+            'users': [user.to_out() for user in users]
         })
         
     except Exception as e:
@@ -509,9 +840,49 @@ def create_user():
         current_app.logger.error(f"Create user error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+_backup_executor = None
+
+def _get_backup_executor():
+    """Single native worker that writes backups one at a time, off the request path"""
+    global _backup_executor
+    if _backup_executor is None:
+        _backup_executor = _native_thread_pool_executor()(max_workers=1)
+    return _backup_executor
+
+def _write_backup(app, backup_path):
+    """Dump every system table to backup_path; the file appears once it is complete"""
+    with app.app_context():
+        try:
+            # Stream each table with a server-side cursor so memory stays flat
+            # regardless of database size
+            errors = {}
+            partial_path = f"{backup_path}.partial"
+            with open(partial_path, 'wb', buffering=BACKUP_WRITE_BUFFER) as f:
+                f.write(b'{"timestamp":' + orjson.dumps(datetime.utcnow().isoformat()))
+                f.write(b',"version":"1.0.0","data":{')
+                for table_index, (table_name, model_class) in enumerate(SYSTEM_TABLES):
+                    if table_index:
+                        f.write(b',')
+                    f.write(orjson.dumps(table_name) + b':[')
+                    try:
+                        to_dict = _record_serializer(model_class)
+                        for record_index, record in enumerate(model_class.query.yield_per(BACKUP_BATCH_SIZE)):
+                            if record_index:
+                                f.write(b',')
+                            f.write(orjson.dumps(to_dict(record)))
+                    except Exception as e:
+                        db.session.rollback()
+                        errors[table_name] = str(e)
+                    f.write(b']')
+                f.write(b'},"errors":' + orjson.dumps(errors) + b'}')
+            os.replace(partial_path, backup_path)
+            app.logger.info(f"Backup written: {backup_path} ({len(SYSTEM_TABLES) - len(errors)} tables)")
+        except Exception as e:
+            app.logger.error(f"Backup failed: {str(e)}")
+
 @admin_bp.route('/backup', methods=['POST'])
 def create_backup():
-    """Create system backup"""
+    """Start a system backup in the background"""
     try:
         # Create backup directory
         backup_dir = 'backups'
@@ -521,47 +892,14 @@ def create_backup():
         backup_name = f"queryforge_backup_{timestamp}"
         backup_path = os.path.join(backup_dir, f"{backup_name}.json")
         
-        # Collect all data
-        backup_data = {
-            'timestamp': datetime.utcnow().isoformat(),
-            'version': '1.0.0',
-            'data': {}
-        }
-        
-        # System tables
-        system_tables = [
-            ('projects', Project),
-            ('data_sources', DataSource),
-            ('table_info', TableInfo),
-            ('data_dictionary', DataDictionary),
-            ('embedding_models', EmbeddingModel),
-            ('search_indexes', SearchIndex),
-            ('chat_history', ChatHistory),
-            ('users', User)
-        ]
-        
-        for table_name, model_class in system_tables:
-            try:
-                records = model_class.query.all()
-                backup_data['data'][table_name] = [record.to_dict() for record in records]
-            except Exception as e:
-                backup_data['data'][table_name] = {'error': str(e)}
-        
-        # Save backup
-        with open(backup_path, 'w') as f:
-            json.dump(backup_data, f, indent=2)
-        
-        # Get backup file size
-        backup_size = os.path.getsize(backup_path)
+        _get_backup_executor().submit(_write_backup, current_app._get_current_object(), backup_path)
         
         return jsonify({
             'status': 'success',
-            'message': 'Backup created successfully',
+            'message': 'Backup started; it is listed under /backups once complete',
             'backup_name': backup_name,
-            'backup_path': backup_path,
-            'backup_size_mb': round(backup_size / (1024 * 1024), 2),
-            'tables_backed_up': len([k for k, v in backup_data['data'].items() if 'error' not in v])
-        })
+            'backup_path': backup_path
+        }), 202
         
     except Exception as e:
         current_app.logger.error(f"Create backup error: {str(e)}")
@@ -580,18 +918,18 @@ def list_backups():
             })
         
         backups = []
-        for filename in os.listdir(backup_dir):
-            if filename.endswith('.json'):
-                file_path = os.path.join(backup_dir, filename)
-                file_size = os.path.getsize(file_path)
-                file_mtime = datetime.fromtimestamp(os.path.getmtime(file_path))
-                
-                backups.append({
-                    'filename': filename,
-                    'size_mb': round(file_size / (1024 * 1024), 2),
-                    'created_at': file_mtime.isoformat(),
-                    'age_hours': (datetime.utcnow() - file_mtime).total_seconds() / 3600
-                })
+        now_ts = time.time()
+        with os.scandir(backup_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith('.json'):
+                    file_stat = entry.stat()
+                    
+                    backups.append({
+                        'filename': entry.name,
+                        'size_mb': round(file_stat.st_size / (1024 * 1024), 2),
+                        'created_at': datetime.fromtimestamp(file_stat.st_mtime).isoformat(),
+                        'age_hours': (now_ts - file_stat.st_mtime) / 3600
+                    })
         
         # Sort by creation time (newest first)
         backups.sort(key=lambda x: x['created_at'], reverse=True)
@@ -605,6 +943,27 @@ def list_backups():
         current_app.logger.error(f"List backups error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _vacuum_project_db(db_path):
+    """VACUUM and ANALYZE one project database on its own connection"""
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute('VACUUM')
+        conn.execute('ANALYZE')
+        conn.commit()
+
+def _native_thread_pool_executor():
+    """ThreadPoolExecutor class whose workers are real OS threads"""
+    # Under the gevent worker the stdlib executor's threads are greenlets on the
+    # hub, so the VACUUMs would run one at a time and stall every other request;
+    # gevent's executor runs them on native threads and waits cooperatively
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+            return NativeThreadPoolExecutor
+    except ImportError:
+        pass
+    return ThreadPoolExecutor
+
 @admin_bp.route('/optimize', methods=['POST'])
 def optimize_database():
     """Optimize database performance"""
@@ -620,25 +979,28 @@ def optimize_database():
         except Exception as e:
             optimization_results['system_db'] = f'error: {str(e)}'
         
-        # Project databases optimization
-        projects = Project.query.all()
-        for project in projects:
-            try:
-                search_service = SearchService()
-                db_path = search_service._get_project_db_path(project.id)
-                
-                if os.path.exists(db_path):
-                    conn = sqlite3.connect(db_path)
-                    cursor = conn.cursor()
-                    
-                    cursor.execute('VACUUM')
-                    cursor.execute('ANALYZE')
-                    conn.commit()
-                    conn.close()
-                    
-                    optimization_results[f'project_{project.id}'] = 'optimized'
-            except Exception as e:
-                optimization_results[f'project_{project.id}'] = f'error: {str(e)}'
+        # Project databases optimization, several files at a time
+        search_service = _get_search_service()
+        project_db_paths = {}
+        for project_id, in db.session.query(Project.id):
+            db_path = search_service._get_project_db_path(project_id)
+            if os.path.exists(db_path):
+                project_db_paths[project_id] = db_path
+        
+        if project_db_paths:
+            executor_class = _native_thread_pool_executor()
+            with executor_class(max_workers=min(OPTIMIZE_MAX_WORKERS, len(project_db_paths))) as executor:
+                futures = {
+                    executor.submit(_vacuum_project_db, db_path): project_id
+                    for project_id, db_path in project_db_paths.items()
+                }
+                for future in as_completed(futures):
+                    project_id = futures[future]
+                    try:
+                        future.result()
+                        optimization_results[f'project_{project_id}'] = 'optimized'
+                    except Exception as e:
+                        optimization_results[f'project_{project_id}'] = f'error: {str(e)}'
         
         # Clean up temporary files
         temp_cleaned = 0
@@ -665,6 +1027,26 @@ def optimize_database():
         current_app.logger.error(f"Optimize database error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+LOG_TAIL_BLOCK_SIZE = 64 * 1024
+
+# Matches the '%(asctime)s %(levelname)s: ...' format of the app.log handler
+LOG_LINE_PATTERN = re.compile(rb'(\d{4}-\d\d-\d\d [\d:,]+) (DEBUG|INFO|WARNING|ERROR|CRITICAL):')
+
+def _tail_lines(path, count):
+    """Return the last count lines of a file as bytes, reading backwards in blocks"""
+    if count <= 0:
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        buffer = b''
+        while position > 0 and buffer.count(b'\n') <= count:
+            read_size = min(LOG_TAIL_BLOCK_SIZE, position)
+            position -= read_size
+            f.seek(position)
+            buffer = f.read(read_size) + buffer
+    return buffer.splitlines()[-count:]
+
 @admin_bp.route('/logs', methods=['GET'])
 def get_system_logs():
     """Get system logs"""
@@ -680,26 +1062,24 @@ def get_system_logs():
                 'message': 'No log file found'
             })
         
-        # Read last N lines
-        with open(log_file, 'r') as f:
-            all_lines = f.readlines()
-        
-        # Get last N lines
-        recent_lines = all_lines[-lines:] if len(all_lines) > lines else all_lines
+        # Read last N lines from the end of the file
+        recent_lines = _tail_lines(log_file, lines)
         
-        # Filter by level if specified
+        # Filter by level if specified, before decoding
         if level != 'all':
-            recent_lines = [line for line in recent_lines if level.upper() in line.upper()]
+            level_bytes = level.upper().encode()
+            recent_lines = [line for line in recent_lines if level_bytes in line.upper()]
         
         # Parse log lines
         logs = []
         for line in recent_lines:
             line = line.strip()
             if line:
+                match = LOG_LINE_PATTERN.match(line)
                 logs.append({
-                    'timestamp': line.split(']')[0].replace('[', '') if ']' in line else '',
-                    'level': 'INFO' if 'INFO' in line else 'ERROR' if 'ERROR' in line else 'WARNING' if 'WARNING' in line else 'DEBUG',
-                    'message': line
+                    'timestamp': match.group(1).decode() if match else '',
+                    'level': match.group(2).decode() if match else 'DEBUG',
+                    'message': line.decode('utf-8', errors='replace')
                 })
         
         return jsonify({
@@ -1,20 +1,100 @@
 # routes/chat_routes.py
-from flask import Blueprint, request, jsonify, current_app
-from models import ChatHistory, Project, User, db
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from models import ChatHistory, ChatSession, Project, User, db
 from services.llm_service import LLMService
 from services.search_service import SearchService
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime
+from difflib import SequenceMatcher
+from fuzzywuzzy import fuzz, process
+import hashlib
+import threading
 import uuid
 import time
 import traceback
+import msgspec
+import numpy as np
+import pandas as pd
 
 chat_bp = Blueprint('chat', __name__)
 
+# The Azure OpenAI client keeps an HTTP connection pool and SearchService
+# builds an EmbeddingService, so each worker process shares one of each
+_search_service = None
+_llm_service = None
+
+def _get_search_service():
+    """Return the shared SearchService, creating it on first use"""
+    global _search_service
+    if _search_service is None:
+        _search_service = SearchService()
+    return _search_service
+
+def _get_llm_service():
+    """Return the shared LLMService, creating it on first use"""
+    global _llm_service
+    if _llm_service is None:
+        _llm_service = LLMService()
+    return _llm_service
+
+# Chats are attributed to the default admin user; its id never changes, so it
+# is looked up once per process (until it exists)
+_admin_user_id = None
+
+def _get_admin_user_id():
+    """Return the id of the default admin user, or None if there is none yet"""
+    global _admin_user_id
+    if _admin_user_id is None:
+        _admin_user_id = db.session.query(User.id).filter_by(username='admin').scalar()
+    return _admin_user_id
+
+# Chat responses and history carry only a preview of the SQL results; the full
+# set is streamed as NDJSON from the session's results endpoint
+CHAT_RESULT_PREVIEW_ROWS = 100
+RESULT_STREAM_BATCH_SIZE = 1000
+
+# quick_query searches mappings for the raw query while the LLM extracts entities
+MAPPING_PREFETCH_WORKERS = 4
+_mapping_prefetch = ThreadPoolExecutor(max_workers=MAPPING_PREFETCH_WORKERS, thread_name_prefix='mapping-prefetch')
+
+# Per-process locks for chat sessions with requests in flight; an entry is
+# dropped once no request holds or waits on it: key -> [lock, users]
+_session_locks = {}
+_session_locks_guard = threading.Lock()
+
+@contextmanager
+def _session_lock(project_id, session_id):
+    """Serialize requests for one chat session within this process"""
+    key = (project_id, session_id)
+    with _session_locks_guard:
+        entry = _session_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _session_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _session_locks[key]
+
+def _run_in_app_context(app, func, *args):
+    """Run func on a worker thread inside its own app context"""
+    with app.app_context():
+        return func(*args)
+
+def _conditional_json(payload):
+    """jsonify with a body ETag; answers 304 when the client's copy matches"""
+    response = jsonify(payload)
+    response.add_etag()
+    return response.make_conditional(request)
+
 @chat_bp.route('/<int:project_id>/llm-status', methods=['GET'])
 def check_llm_status(project_id):
     """Check if LLM service is available"""
     try:
-        llm_service = LLMService()
+        llm_service = _get_llm_service()
         is_available = llm_service.is_available()
         
         return jsonify({
@@ -37,63 +117,181 @@ def get_chat_sessions(project_id):
     try:
         project = Project.query.get_or_404(project_id)
         
-        # Get distinct session IDs with latest timestamp
-        sessions_query = db.session.query(
-            ChatHistory.session_id,
-            db.func.max(ChatHistory.created_at).label('last_activity'),
-            db.func.count(ChatHistory.id).label('query_count')
-        ).filter_by(project_id=project_id).group_by(ChatHistory.session_id)
+        # The list only changes when chat rows are added or removed, so the
+        # session/chat counts and newest activity identify it; a matching poll
+        # skips building the body
+        session_count, chat_count, last_activity = db.session.query(
+            db.func.count(ChatSession.id),
+            db.func.sum(ChatSession.query_count),
+            db.func.max(ChatSession.last_activity)
+        ).filter(ChatSession.project_id == project_id).one()
+        etag = hashlib.md5(f'{session_count}:{chat_count}:{last_activity}'.encode()).hexdigest()
+        if request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        # One summary row per session, kept current as chats are written
+        sessions = ChatSession.query.filter_by(project_id=project_id).order_by(
+            ChatSession.last_activity.desc()
+        ).all()
+        session_list = [session.to_dict() for session in sessions]
         
-        sessions = sessions_query.all()
+        response = jsonify({
+            'status': 'success',
+            'sessions': session_list
+        })
+        response.set_etag(etag)
+        return response
         
-        session_list = []
-        for session in sessions:
-            # Get first query for session name
-            first_chat = ChatHistory.query.filter_by(
-                project_id=project_id,
-                session_id=session.session_id
-            ).order_by(ChatHistory.created_at).first()
-            
-            session_list.append({
-                'session_id': session.session_id,
-                'last_activity': session.last_activity.isoformat() if session.last_activity else None,
-                'query_count': session.query_count,
-                'first_query': first_chat.user_query[:100] + '...' if first_chat and len(first_chat.user_query) > 100 else first_chat.user_query if first_chat else ''
-            })
+    except Exception as e:
+        current_app.logger.error(f"Get chat sessions error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@chat_bp.route('/<int:project_id>/sessions/bulk', methods=['GET', 'POST'])
+def get_bulk_chat_history(project_id):
+    """Get chat history for several sessions in one request"""
+    try:
+        project = Project.query.get_or_404(project_id)
         
-        # Sort by last activity
-        session_list.sort(key=lambda x: x['last_activity'] or '', reverse=True)
+        # Accept ?ids=a,b,c or a JSON body {"session_ids": [...]}
+        if request.method == 'POST':
+            data = request.get_json() or {}
+            session_ids = data.get('session_ids', [])
+        else:
+            session_ids = [sid for sid in request.args.get('ids', '').split(',') if sid]
+        
+        if not session_ids:
+            return jsonify({'error': 'Session IDs are required'}), 400
+        
+        chats = ChatHistory.query.filter(
+            ChatHistory.project_id == project_id,
+            ChatHistory.session_id.in_(session_ids)
+        ).order_by(ChatHistory.session_id, ChatHistory.created_at).all()
+        
+        sessions = {session_id: [] for session_id in session_ids}
+        for chat in chats:
+            sessions[chat.session_id].append(chat.to_dict())
         
         return jsonify({
             'status': 'success',
-            'sessions': session_list
+            'sessions': sessions
         })
         
     except Exception as e:
-        current_app.logger.error(f"Get chat sessions error: {str(e)}")
+        current_app.logger.error(f"Get bulk chat history error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+_HISTORY_SUMMARY_COLUMNS = (
+    ChatHistory.id,
+    ChatHistory.session_id,
+    ChatHistory.user_query,
+    ChatHistory.generated_sql,
+    ChatHistory.sql_results,
+    ChatHistory.final_response,
+    ChatHistory.processing_time,
+    ChatHistory.status,
+    ChatHistory.error_message,
+    ChatHistory.created_at
+)
+
 @chat_bp.route('/<int:project_id>/sessions/<session_id>', methods=['GET'])
 def get_chat_history(project_id, session_id):
     """Get chat history for a specific session"""
     try:
         project = Project.query.get_or_404(project_id)
         
-        chats = ChatHistory.query.filter_by(
-            project_id=project_id,
-            session_id=session_id
-        ).order_by(ChatHistory.created_at).all()
-        
-        return jsonify({
+        # Only the fields the conversation view renders; entities, mappings and
+        # confirmation_steps (which embeds the schema context) come from the
+        # per-chat endpoint below
+        rows = db.session.execute(
+            db.select(*_HISTORY_SUMMARY_COLUMNS)
+            .where(ChatHistory.project_id == project_id, ChatHistory.session_id == session_id)
+            .order_by(ChatHistory.created_at)
+        ).mappings()
+        
+        chat_history = []
+        for row in rows:
+            chat = dict(row)
+            chat['sql_results'] = chat['sql_results'] or []
+            chat['processing_time'] = round(chat['processing_time'], 3) if chat['processing_time'] else 0.0
+            chat['created_at'] = chat['created_at'].isoformat() if chat['created_at'] else None
+            chat_history.append(chat)
+        
+        # Steps update rows in place, so the ETag hashes the body itself
+        return _conditional_json({
             'status': 'success',
             'session_id': session_id,
-            'chat_history': [chat.to_dict() for chat in chats]
+            'chat_history': chat_history
         })
         
     except Exception as e:
         current_app.logger.error(f"Get chat history error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@chat_bp.route('/<int:project_id>/history/<int:chat_id>', methods=['GET'])
+def get_chat_detail(project_id, chat_id):
+    """Get one chat record with all of its JSON fields"""
+    try:
+        chat = ChatHistory.query.filter_by(id=chat_id, project_id=project_id).first()
+        if not chat:
+            return jsonify({'error': 'Chat not found'}), 404
+        
+        return jsonify({
+            'status': 'success',
+            'chat': chat.to_dict()
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Get chat detail error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+def _chat_history_columns(project_id):
+    """Fetch the scalar ChatHistory columns used by analytics as a columnar DataFrame"""
+    query = db.select(
+        ChatHistory.id,
+        ChatHistory.status,
+        ChatHistory.processing_time,
+        ChatHistory.created_at
+    ).where(ChatHistory.project_id == project_id)
+    return pd.read_sql(query, db.session.connection())
+
+@chat_bp.route('/<int:project_id>/stats', methods=['GET'])
+def get_chat_stats(project_id):
+    """Get query volume, status breakdown and processing-time distribution"""
+    try:
+        project = Project.query.get_or_404(project_id)
+        
+        history = _chat_history_columns(project_id)
+        times = history['processing_time'].dropna().to_numpy(dtype=np.float64)
+        
+        processing_time = None
+        if times.size:
+            p50, p95, p99 = np.percentile(times, [50, 95, 99])
+            processing_time = {
+                'mean': round(float(times.mean()), 3),
+                'p50': round(float(p50), 3),
+                'p95': round(float(p95), 3),
+                'p99': round(float(p99), 3),
+                'max': round(float(times.max()), 3)
+            }
+        
+        return jsonify({
+            'status': 'success',
+            'stats': {
+                'total_queries': int(len(history)),
+                'status_counts': {
+                    status: int(count)
+                    for status, count in history['status'].value_counts().items()
+                },
+                'processing_time': processing_time
+            }
+        })
+        
+    except Exception as e:
+        current_app.logger.error(f"Get chat stats error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @chat_bp.route('/<int:project_id>/query', methods=['POST'])
 def process_natural_language_query(project_id):
     """Process a natural language query with step-by-step confirmation"""
@@ -109,64 +307,71 @@ def process_natural_language_query(project_id):
         step = data.get('step', 'extract_entities')
         confirmation_data = data.get('confirmation_data', {})
         
-        # Get default user
-        user = User.query.filter_by(username='admin').first()
-        
         start_time = time.time()
         
-        # Initialize or get existing chat record
-        chat = ChatHistory.query.filter_by(
-            project_id=project_id,
-            session_id=session_id,
-            user_query=query
-        ).first()
-        
-        if not chat:
-            chat = ChatHistory(
+        # One request per session at a time, so a double submit waits for the
+        # first and then finds its row instead of inserting a duplicate
+        with _session_lock(project_id, session_id):
+            # Initialize or get existing chat record; the hash drives the index
+            # and the text comparison guards against collisions
+            chat = ChatHistory.query.filter_by(
                 project_id=project_id,
                 session_id=session_id,
-                user_query=query,
-                created_by=user.id if user else None,
-                status='pending'
-            )
-            db.session.add(chat)
+                user_query_hash=ChatHistory.hash_query(query),
+                user_query=query
+            ).first()
+            
+            if not chat:
+                chat = ChatHistory(
+                    project_id=project_id,
+                    session_id=session_id,
+                    user_query=query,
+                    created_by=_get_admin_user_id(),
+                    status='pending'
+                )
+                db.session.add(chat)
+            
+            # Steps only set attributes on chat and the single commit below writes
+            # them. no_autoflush keeps the new row from being flushed early, which
+            # would hold SQLite's write lock across the LLM calls.
+            with db.session.no_autoflush:
+                # Step 1: Extract entities
+                if step == 'extract_entities':
+                    result = _extract_entities_step(project_id, query, chat)
+                
+                # Step 2: Confirm entities and find mappings
+                elif step == 'confirm_entities':
+                    result = _confirm_entities_step(project_id, query, chat, confirmation_data)
+                
+                # Step 3: Confirm mappings and select tables
+                elif step == 'confirm_mappings':
+                    result = _confirm_mappings_step(project_id, query, chat, confirmation_data)
+                
+                # Step 4: Generate and confirm SQL
+                elif step == 'generate_sql':
+                    result = _generate_sql_step(project_id, query, chat, confirmation_data)
+                
+                # Step 5: Execute SQL
+                elif step == 'execute_sql':
+                    result = _execute_sql_step(project_id, query, chat, confirmation_data)
+                
+                # Step 6: Process feedback and regenerate
+                elif step == 'process_feedback':
+                    result = _process_feedback_step(project_id, query, chat, confirmation_data)
+                
+                else:
+                    db.session.rollback()
+                    return jsonify({'error': f'Invalid step: {step}'}), 400
+            
+            # Update processing time
+            processing_time = time.time() - start_time
+            chat.processing_time = processing_time
             db.session.commit()
-        
-        # Step 1: Extract entities
-        if step == 'extract_entities':
-            result = _extract_entities_step(project_id, query, chat)
-        
-        # Step 2: Confirm entities and find mappings
-        elif step == 'confirm_entities':
-            result = _confirm_entities_step(project_id, query, chat, confirmation_data)
-        
-        # Step 3: Confirm mappings and select tables
-        elif step == 'confirm_mappings':
-            result = _confirm_mappings_step(project_id, query, chat, confirmation_data)
-        
-        # Step 4: Generate and confirm SQL
-        elif step == 'generate_sql':
-            result = _generate_sql_step(project_id, query, chat, confirmation_data)
-        
-        # Step 5: Execute SQL
-        elif step == 'execute_sql':
-            result = _execute_sql_step(project_id, query, chat, confirmation_data)
-        
-        # Step 6: Process feedback and regenerate
-        elif step == 'process_feedback':
-            result = _process_feedback_step(project_id, query, chat, confirmation_data)
-        
-        else:
-            return jsonify({'error': f'Invalid step: {step}'}), 400
-        
-        # Update processing time
-        processing_time = time.time() - start_time
-        chat.processing_time = processing_time
-        db.session.commit()
-        
-        return jsonify(result)
+            
+            return jsonify(result)
         
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Process NL query error: {str(e)}")
         current_app.logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
@@ -175,11 +380,11 @@ def _extract_entities_step(project_id, query, chat):
     """Step 1: Extract entities from query"""
     try:
         # Get schema context
-        search_service = SearchService()
+        search_service = _get_search_service()
         schema_context = search_service.get_table_schema_context(project_id)
         
         # Extract entities using LLM
-        llm_service = LLMService()
+        llm_service = _get_llm_service()
         if not llm_service.is_available():
             return {
                 'status': 'error',
@@ -191,7 +396,6 @@ def _extract_entities_step(project_id, query, chat):
         if 'error' in entity_result:
             chat.status = 'error'
             chat.error_message = entity_result['error']
-            db.session.commit()
             return {
                 'status': 'error',
                 'message': entity_result['error']
@@ -206,7 +410,7 @@ def _extract_entities_step(project_id, query, chat):
             }
         
         # Save entities
-        chat.set_extracted_entities(entities)
+        chat.extracted_entities = entities
         
         # Set confirmation step
         confirmation_steps = {
@@ -214,9 +418,7 @@ def _extract_entities_step(project_id, query, chat):
             'next_step': 'confirm_mappings',
             'extracted_entities': entities
         }
-        chat.set_confirmation_steps(confirmation_steps)
-        
-        db.session.commit()
+        chat.confirmation_steps = confirmation_steps
         
         return {
             'status': 'success',
@@ -232,7 +434,6 @@ def _extract_entities_step(project_id, query, chat):
         current_app.logger.error(traceback.format_exc())
         chat.status = 'error'
         chat.error_message = str(e)
-        db.session.commit()
         return {'status': 'error', 'message': str(e)}
 
 def _confirm_entities_step(project_id, query, chat, confirmation_data):
@@ -247,11 +448,11 @@ def _confirm_entities_step(project_id, query, chat, confirmation_data):
             }
         
         # Search for entity mappings
-        search_service = SearchService()
+        search_service = _get_search_service()
         mapping_results = search_service.search_entities(project_id, query, confirmed_entities)
         
         # Save entity mappings
-        chat.set_entity_mappings(mapping_results)
+        chat.entity_mappings = mapping_results
         
         # Set confirmation step
         confirmation_steps = {
@@ -260,9 +461,7 @@ def _confirm_entities_step(project_id, query, chat, confirmation_data):
             'confirmed_entities': confirmed_entities,
             'mapping_results': mapping_results
         }
-        chat.set_confirmation_steps(confirmation_steps)
-        
-        db.session.commit()
+        chat.confirmation_steps = confirmation_steps
         
         return {
             'status': 'success',
@@ -298,7 +497,7 @@ def _confirm_mappings_step(project_id, query, chat, confirmation_data):
                 table_ids.add(mapping.get('table_id'))
         
         # Get detailed schema context
-        search_service = SearchService()
+        search_service = _get_search_service()
         schema_context = search_service.get_table_schema_context(project_id, list(table_ids))
         
         # Update confirmation step
@@ -309,9 +508,7 @@ def _confirm_mappings_step(project_id, query, chat, confirmation_data):
             'selected_mappings': confirmed_mappings,
             'schema_context': schema_context
         }
-        chat.set_confirmation_steps(confirmation_steps)
-        
-        db.session.commit()
+        chat.confirmation_steps = confirmation_steps
         
         return {
             'status': 'success',
@@ -327,17 +524,92 @@ def _confirm_mappings_step(project_id, query, chat, confirmation_data):
         current_app.logger.error(f"Confirm mappings step error: {str(e)}")
         return {'status': 'error', 'message': str(e)}
 
+def _pack_schema_context(schema_context, selected_mappings, entities,
+                         max_tables=10, max_cols_per_table=20, max_dictionary_terms=20):
+    """Trim a schema context to what the mappings point at before it goes into the SQL prompt"""
+    mapped_table_ids = []
+    mapped_columns = set()
+    mapped_terms = set()
+    for mapping in selected_mappings:
+        mapping_type = mapping.get('type')
+        if mapping_type == 'table':
+            mapped_table_ids.append(mapping.get('id'))
+        elif mapping_type == 'column':
+            mapped_table_ids.append(mapping.get('table_id'))
+            mapped_columns.add((mapping.get('table_id'), mapping.get('column_name')))
+        elif mapping_type == 'dictionary':
+            mapped_terms.add(mapping.get('term'))
+    
+    entity_texts = [
+        str(entity.get('text', '')).lower() for entity in entities if isinstance(entity, dict)
+    ]
+    
+    def column_score(table_id, column_name):
+        name = str(column_name).lower()
+        similarity = max(
+            (SequenceMatcher(None, name, text).ratio() for text in entity_texts), default=0.0
+        )
+        return ((table_id, column_name) in mapped_columns) + similarity
+    
+    # Keep mapped tables in mapping order; fall back to every table if none match
+    tables = schema_context.get('tables', {})
+    table_rank = {table_id: rank for rank, table_id in enumerate(dict.fromkeys(mapped_table_ids))}
+    table_names = [name for name, table in tables.items() if table.get('id') in table_rank] or list(tables)
+    table_names.sort(key=lambda name: table_rank.get(tables[name].get('id'), len(table_rank)))
+    
+    packed_tables = {}
+    for table_name in table_names[:max_tables]:
+        table = tables[table_name]
+        columns = table.get('columns', [])
+        if len(columns) > max_cols_per_table:
+            top = sorted(
+                range(len(columns)),
+                key=lambda i: column_score(table.get('id'), columns[i].get('name')),
+                reverse=True
+            )[:max_cols_per_table]
+            columns = [columns[i] for i in sorted(top)]
+        column_names = [column.get('name') for column in columns]
+        packed_tables[table_name] = {
+            **table,
+            'columns': columns,
+            'sample_data': [
+                {name: row.get(name) for name in column_names}
+                for row in table.get('sample_data', []) if isinstance(row, dict)
+            ]
+        }
+    
+    # Mapped dictionary terms first, then terms describing the kept tables
+    dictionary = [
+        entry for entry in schema_context.get('dictionary', [])
+        if entry.get('term') in mapped_terms or entry.get('source_table') in packed_tables
+    ]
+    dictionary.sort(key=lambda entry: entry.get('term') not in mapped_terms)
+    
+    return {
+        'tables': packed_tables,
+        'relationships': schema_context.get('relationships', []),
+        'dictionary': [
+            {
+                'term': entry.get('term'),
+                'definition': entry.get('definition'),
+                'source_table': entry.get('source_table'),
+                'source_column': entry.get('source_column')
+            }
+            for entry in dictionary[:max_dictionary_terms]
+        ]
+    }
+
 def _generate_sql_step(project_id, query, chat, confirmation_data):
     """Step 4: Generate and confirm SQL"""
     try:
         # Get confirmation data
-        confirmation_steps = chat.get_confirmation_steps()
+        confirmation_steps = chat.confirmation_steps or {}
         schema_context = confirmation_steps.get('schema_context', {})
         selected_mappings = confirmation_steps.get('selected_mappings', [])
-        entities = chat.get_extracted_entities()
+        entities = chat.extracted_entities or []
         
         # Generate SQL using LLM
-        llm_service = LLMService()
+        llm_service = _get_llm_service()
         if not llm_service.is_available():
             return {
                 'status': 'error',
@@ -345,7 +617,8 @@ def _generate_sql_step(project_id, query, chat, confirmation_data):
             }
         
         sql_result = llm_service.generate_sql(
-            query, entities, selected_mappings, schema_context
+            query, entities, selected_mappings,
+            _pack_schema_context(schema_context, selected_mappings, entities)
         )
         
         if 'error' in sql_result:
@@ -363,9 +636,7 @@ def _generate_sql_step(project_id, query, chat, confirmation_data):
         confirmation_steps['current_step'] = 'execute_sql'
         confirmation_steps['generated_sql'] = generated_sql
         confirmation_steps['sql_metadata'] = sql_result
-        chat.set_confirmation_steps(confirmation_steps)
-        
-        db.session.commit()
+        chat.confirmation_steps = confirmation_steps
         
         return {
             'status': 'success',
@@ -394,44 +665,44 @@ def _execute_sql_step(project_id, query, chat, confirmation_data):
             }
         
         # Execute SQL
-        search_service = SearchService()
-        sql_result = search_service.execute_sql_query(project_id, sql_query)
+        search_service = _get_search_service()
+        sql_result = search_service.execute_sql_query(
+            project_id, sql_query, preview_rows=CHAT_RESULT_PREVIEW_ROWS
+        )
         
         if 'error' in sql_result:
             chat.status = 'error'
             chat.error_message = sql_result['error']
-            db.session.commit()
             return {
                 'status': 'error',
                 'message': sql_result['error']
             }
         
         # Save SQL results
-        chat.set_sql_results(sql_result['data'])
+        chat.sql_results = sql_result['data']
         
         # Generate final response using LLM
-        llm_service = LLMService()
+        llm_service = _get_llm_service()
         if llm_service.is_available():
             final_response_result = llm_service.generate_final_response(
-                query, sql_query, sql_result['data']
+                query, sql_query, sql_result['data'], sql_result['row_count']
             )
             final_response = final_response_result.get('response', 'Query completed successfully.')
         else:
-            final_response = f"Found {len(sql_result['data'])} results for your query."
+            final_response = f"Found {sql_result['row_count']} results for your query."
         
         # Update chat record
         chat.final_response = final_response
         chat.status = 'completed'
         
-        db.session.commit()
-        
         return {
             'status': 'success',
             'step': 'completed',
             'session_id': chat.session_id,
             'sql_query': sql_query,
             'results': sql_result['data'],
-            'result_count': len(sql_result['data']),
+            'result_count': sql_result['row_count'],
+            'results_url': f'/api/chat/{project_id}/sessions/{chat.session_id}/results',
             'final_response': final_response,
             'message': 'Query completed successfully.',
             'next_action': 'User can provide feedback or ask a new question'
@@ -441,7 +712,6 @@ def _execute_sql_step(project_id, query, chat, confirmation_data):
         current_app.logger.error(f"Execute SQL step error: {str(e)}")
         chat.status = 'error'
         chat.error_message = str(e)
-        db.session.commit()
         return {'status': 'error', 'message': str(e)}
 
 def _process_feedback_step(project_id, query, chat, confirmation_data):
@@ -462,23 +732,23 @@ def _process_feedback_step(project_id, query, chat, confirmation_data):
         chat.status = 'pending'
         
         # Get previous entities and mappings
-        entities = chat.get_extracted_entities()
-        mappings = chat.get_entity_mappings()
+        entities = chat.extracted_entities or []
+        mappings = chat.entity_mappings or {}
         
         # Incorporate feedback into entity extraction
         enhanced_query = f"{query} (User feedback: {feedback})"
         
         # Re-extract entities with feedback
-        search_service = SearchService()
+        search_service = _get_search_service()
         schema_context = search_service.get_table_schema_context(project_id)
         
-        llm_service = LLMService()
+        llm_service = _get_llm_service()
         if llm_service.is_available():
             entity_result = llm_service.extract_entities(enhanced_query, schema_context)
             
             if 'error' not in entity_result:
                 entities = entity_result.get('entities', [])
-                chat.set_extracted_entities(entities)
+                chat.extracted_entities = entities
         
         # Update confirmation step to restart from entity confirmation
         confirmation_steps = {
@@ -488,9 +758,7 @@ def _process_feedback_step(project_id, query, chat, confirmation_data):
             'user_feedback': feedback,
             'regeneration': True
         }
-        chat.set_confirmation_steps(confirmation_steps)
-        
-        db.session.commit()
+        chat.confirmation_steps = confirmation_steps
         
         return {
             'status': 'success',
@@ -510,22 +778,26 @@ def _process_feedback_step(project_id, query, chat, confirmation_data):
 def delete_chat_session(project_id, session_id):
     """Delete a chat session"""
     try:
-        project = Project.query.get_or_404(project_id)
+        # Existence check only; no need to load the Project row
+        if db.session.query(Project.id).filter_by(id=project_id).scalar() is None:
+            return jsonify({'error': 'Project not found'}), 404
         
-        # Delete all chats in the session
-        chats = ChatHistory.query.filter_by(
+        # Delete all chats in the session with one DELETE; nothing references
+        # chat_history rows, so there are no children to clear first
+        deleted_count = ChatHistory.query.filter_by(
             project_id=project_id,
             session_id=session_id
-        ).all()
-        
-        for chat in chats:
-            db.session.delete(chat)
+        ).delete(synchronize_session=False)
+        ChatSession.query.filter_by(
+            project_id=project_id,
+            session_id=session_id
+        ).delete(synchronize_session=False)
         
         db.session.commit()
         
         return jsonify({
             'status': 'success',
-            'message': f'Chat session deleted: {len(chats)} queries removed'
+            'message': f'Chat session deleted: {deleted_count} queries removed'
         })
         
     except Exception as e:
@@ -533,12 +805,118 @@ def delete_chat_session(project_id, session_id):
         current_app.logger.error(f"Delete chat session error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@chat_bp.route('/<int:project_id>/sessions/<session_id>/results', methods=['GET'])
+def stream_session_results(project_id, session_id):
+    """Stream every row of the session's latest query as NDJSON (columns first)"""
+    try:
+        chat = ChatHistory.query.filter(
+            ChatHistory.project_id == project_id,
+            ChatHistory.session_id == session_id,
+            ChatHistory.status == 'completed',
+            ChatHistory.generated_sql.isnot(None)
+        ).order_by(ChatHistory.created_at.desc()).first()
+        
+        if not chat:
+            return jsonify({'error': 'No completed query in this session'}), 404
+        
+        search_service = _get_search_service()
+        columns, rows = search_service.iter_sql_query(
+            project_id, chat.generated_sql, batch_size=RESULT_STREAM_BATCH_SIZE
+        )
+        
+        def generate():
+            yield msgspec.json.encode({'columns': columns}) + b'\n'
+            for row in rows:
+                yield msgspec.json.encode(row) + b'\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.error(f"Stream session results error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@chat_bp.route('/<int:project_id>/sessions/<session_id>/answer', methods=['GET'])
+def stream_session_answer(project_id, session_id):
+    """Stream the answer for the session's latest query as server-sent events"""
+    try:
+        chat = ChatHistory.query.filter(
+            ChatHistory.project_id == project_id,
+            ChatHistory.session_id == session_id,
+            ChatHistory.status == 'completed',
+            ChatHistory.generated_sql.isnot(None)
+        ).order_by(ChatHistory.created_at.desc()).first()
+        
+        if not chat:
+            return jsonify({'error': 'No completed query in this session'}), 404
+        
+        def event(name, payload):
+            return b'event: ' + name + b'\ndata: ' + msgspec.json.encode(payload) + b'\n\n'
+        
+        def generate():
+            # Answered already (or by another tab): replay it in one event
+            if chat.final_response is not None:
+                yield event(b'done', {'final_response': chat.final_response})
+                return
+            
+            parts = []
+            try:
+                for delta in _get_llm_service().generate_final_response_stream(
+                    chat.user_query, chat.generated_sql, chat.sql_results or [],
+                    (chat.confirmation_steps or {}).get('result_count')
+                ):
+                    parts.append(delta)
+                    yield event(b'delta', {'text': delta})
+            except Exception as e:
+                current_app.logger.error(f"Stream answer error: {str(e)}")
+                yield event(b'error', {'error': str(e)})
+                return
+            
+            # Persist once the whole answer has been sent
+            chat.final_response = ''.join(parts).strip()
+            db.session.commit()
+            yield event(b'done', {'final_response': chat.final_response})
+        
+        response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+        
+    except Exception as e:
+        current_app.logger.error(f"Stream session answer error: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+# Table names for the 'no such table' recovery; application tables only change
+# on deploys, so a short TTL is enough to pick up new ones
+TABLE_NAMES_CACHE_TTL = 60
+_table_names = None  # (names, expires_at)
+
+def _get_table_names():
+    """Names of the user tables in the application database"""
+    global _table_names
+    cached = _table_names
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+    
+    from sqlalchemy import text
+    result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"))
+    names = [row[0] for row in result]
+    _table_names = (names, time.monotonic() + TABLE_NAMES_CACHE_TTL)
+    return names
+
+def _similar_table_names(table_mentioned, table_names, limit=3):
+    """Existing table names closest to one the generated SQL got wrong, best first"""
+    # Levenshtein ratio in C (python-Levenshtein) instead of difflib's
+    # pure-Python SequenceMatcher; the cutoff matches the old 0.4
+    matches = process.extractBests(
+        table_mentioned, table_names, scorer=fuzz.ratio, score_cutoff=40, limit=limit
+    )
+    return [name for name, score in matches]
+
 @chat_bp.route('/<int:project_id>/quick-query', methods=['POST'])
 def quick_query(project_id):
     """Quick query without step-by-step confirmation (for testing)"""
     try:
-        from sqlalchemy import text
-
         project = Project.query.get_or_404(project_id)
         data = request.get_json()
         
@@ -547,27 +925,24 @@ def quick_query(project_id):
         
         query = data['query']
         session_id = str(uuid.uuid4())
-        
-        # Get default user
-        user = User.query.filter_by(username='admin').first()
+        stream_answer = bool(data.get('stream_answer'))
         
         start_time = time.time()
         
-        # Create chat record
+        # Build the chat record; it stays out of the session until the outcome
+        # is known so the whole run is written as a single INSERT
         chat = ChatHistory(
             project_id=project_id,
             session_id=session_id,
             user_query=query,
-            created_by=user.id if user else None,
+            created_by=_get_admin_user_id(),
             status='pending'
         )
-        db.session.add(chat)
-        db.session.commit()
         
         try:
             # Get services
-            search_service = SearchService()
-            llm_service = LLMService()
+            search_service = _get_search_service()
+            llm_service = _get_llm_service()
             
             # Check LLM availability
             if not llm_service.is_available():
@@ -577,6 +952,12 @@ def quick_query(project_id):
             schema_context = search_service.get_table_schema_context(project_id)
             current_app.logger.info(f"Schema context tables: {list(schema_context.get('tables', {}).keys())}")
             
+            # Start the mapping search on the raw query so it overlaps the LLM call
+            seed_search = _mapping_prefetch.submit(
+                _run_in_app_context, current_app._get_current_object(),
+                search_service.search_entities, project_id, query, [{'text': query, 'type': 'unknown'}]
+            )
+            
             # Extract entities
             entity_result = llm_service.extract_entities(query, schema_context)
             if 'error' in entity_result:
@@ -587,11 +968,15 @@ def quick_query(project_id):
                 raise Exception("No entities found in the query. Please try rephrasing your question.")
             
             current_app.logger.info(f"Extracted entities: {entities}")
-            chat.set_extracted_entities(entities)
+            chat.extracted_entities = entities
             
-            # Search for mappings
-            mapping_results = search_service.search_entities(project_id, query, entities)
-            chat.set_entity_mappings(mapping_results)
+            # Search for mappings, reusing the seed search when it found anything
+            seed_results = seed_search.result()
+            if seed_results.get('combined_results'):
+                mapping_results = search_service.refine_mappings(project_id, query, seed_results, entities)
+            else:
+                mapping_results = search_service.search_entities(project_id, query, entities)
+            chat.entity_mappings = mapping_results
             
             # Use top mappings automatically
             combined_results = mapping_results.get('combined_results', [])
@@ -623,7 +1008,10 @@ def quick_query(project_id):
             current_app.logger.info(f"Detailed schema tables: {list(detailed_schema.get('tables', {}).keys())}")
             
             # Generate SQL
-            sql_result = llm_service.generate_sql(query, entities, top_mappings, detailed_schema)
+            sql_result = llm_service.generate_sql(
+                query, entities, top_mappings,
+                _pack_schema_context(detailed_schema, top_mappings, entities)
+            )
             if 'error' in sql_result:
                 raise Exception(f"SQL generation failed: {sql_result['error']}")
             
@@ -633,7 +1021,9 @@ def quick_query(project_id):
             chat.generated_sql = generated_sql
             
             # Execute SQL with enhanced error handling
-            execution_result = search_service.execute_sql_query(project_id, generated_sql)
+            execution_result = search_service.execute_sql_query(
+                project_id, generated_sql, preview_rows=CHAT_RESULT_PREVIEW_ROWS
+            )
             if 'error' in execution_result:
                 current_app.logger.error(f"SQL execution failed. SQL: {generated_sql}")
                 current_app.logger.error(f"Error: {execution_result['error']}")
@@ -642,14 +1032,12 @@ def quick_query(project_id):
                 if 'no such table' in execution_result['error'].lower():
                     try:
                         # Get actual table names from database
-                        actual_tables_result = db.session.execute(text("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'"))
-                        actual_table_names = [row[0] for row in actual_tables_result]
+                        actual_table_names = _get_table_names()
                         current_app.logger.error(f"Available tables in database: {actual_table_names}")
                         
                         # Try to find a similar table name
-                        import difflib
                         table_mentioned = execution_result['error'].split('no such table: ')[-1].strip()
-                        similar_tables = difflib.get_close_matches(table_mentioned, actual_table_names, n=3, cutoff=0.4)
+                        similar_tables = _similar_table_names(table_mentioned, actual_table_names)
                         if similar_tables:
                             current_app.logger.info(f"Similar table names found: {similar_tables}")
                             
@@ -680,18 +1068,23 @@ def quick_query(project_id):
                     raise Exception(f"SQL execution failed: {execution_result['error']}")
             
             results_data = execution_result['data']
-            chat.set_sql_results(results_data)
+            chat.sql_results = results_data
+            chat.confirmation_steps = {'result_count': execution_result['row_count']}
             
-            # Generate final response
-            final_response_result = llm_service.generate_final_response(
-                query, generated_sql, results_data
-            )
-            final_response = final_response_result.get('response', 'Query completed successfully.')
+            # Generate final response, unless the client streams it separately
+            if stream_answer:
+                final_response = None
+            else:
+                final_response_result = llm_service.generate_final_response(
+                    query, generated_sql, results_data, execution_result['row_count']
+                )
+                final_response = final_response_result.get('response', 'Query completed successfully.')
             
             # Update chat record
             chat.final_response = final_response
             chat.status = 'completed'
             chat.processing_time = time.time() - start_time
+            db.session.add(chat)
             db.session.commit()
             
             return jsonify({
@@ -699,8 +1092,10 @@ def quick_query(project_id):
                 'session_id': session_id,
                 'sql_query': generated_sql,
                 'results': results_data,
-                'result_count': len(results_data),
+                'result_count': execution_result['row_count'],
+                'results_url': f'/api/chat/{project_id}/sessions/{session_id}/results',
                 'final_response': final_response,
+                'answer_stream_url': f'/api/chat/{project_id}/sessions/{session_id}/answer' if stream_answer else None,
                 'processing_time': round(chat.processing_time, 3),
                 'entities_extracted': len(entities),
                 'mappings_found': len(combined_results),
@@ -711,10 +1106,12 @@ def quick_query(project_id):
             })
             
         except Exception as e:
-            # Update chat with error
+            # Record the chat with its error
+            db.session.rollback()
             chat.status = 'error'
             chat.error_message = str(e)
             chat.processing_time = time.time() - start_time
+            db.session.add(chat)
             db.session.commit()
             
             current_app.logger.error(f"Quick query error: {str(e)}")
@@ -731,10 +1128,9 @@ def debug_database_info(project_id):
     """Debug endpoint to check database configuration"""
     try:
         import os
-        from services.search_service import SearchService
         from sqlalchemy import text
 
-        search_service = SearchService()
+        search_service = _get_search_service()
         
         # Get database URI and current directory info
         db_uri = current_app.config.get('SQLALCHEMY_DATABASE_URI', '')
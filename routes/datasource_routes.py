@@ -1,13 +1,19 @@
 # routes/datasource_routes.py
 from flask import Blueprint, request, jsonify, current_app
 from models import DataSource, TableInfo, Project, db
+from sqlalchemy.orm.attributes import flag_modified
 from services.data_service import DataService
+from schemas import json_response
 import os
+import shutil
 import sqlite3
 import json
 
 datasource_bp = Blueprint('datasources', __name__)
 
+# Copy uploads in 1 MiB chunks rather than FileStorage.save()'s 16 KiB default
+UPLOAD_COPY_BUFFER_SIZE = 1 << 20
+
 @datasource_bp.route('/<int:project_id>', methods=['GET'])
 def get_data_sources(project_id):
     """Get all data sources for a project"""
@@ -15,9 +21,17 @@ def get_data_sources(project_id):
         project = Project.query.get_or_404(project_id)
         data_sources = DataSource.query.filter_by(project_id=project_id).all()
         
-        return jsonify({
+        # Count tables for every source in one query
+        table_counts = dict(
+            db.session.query(TableInfo.data_source_id, db.func.count(TableInfo.id))
+            .filter(TableInfo.project_id == project_id)
+            .group_by(TableInfo.data_source_id)
+            .all()
+        )
+        
+        return json_response({
             'status': 'success',
-            'data_sources': [ds.to_dict() for ds in data_sources]
+            'data_sources': [ds.to_out(tables_count=table_counts.get(ds.id, 0)) for ds in data_sources]
         })
         
     except Exception as e:
@@ -39,7 +53,7 @@ def upload_data_source(project_id):
         
         # Validate file extension
         filename = file.filename
-        file_ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        file_ext = os.path.splitext(filename)[1][1:].lower()
         
         if file_ext not in current_app.config['ALLOWED_EXTENSIONS']:
             return jsonify({'error': f'File type .{file_ext} not allowed'}), 400
@@ -51,7 +65,8 @@ def upload_data_source(project_id):
         from werkzeug.utils import secure_filename
         filename = secure_filename(filename)
         file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
+        with open(file_path, 'wb', buffering=0) as out:
+            shutil.copyfileobj(file.stream, out, length=UPLOAD_COPY_BUFFER_SIZE)
         
         # Process file
         data_service = DataService()
@@ -72,7 +87,7 @@ def get_data_source(data_source_id):
         # Get associated tables
         tables = TableInfo.query.filter_by(data_source_id=data_source_id).all()
         
-        result = data_source.to_dict()
+        result = data_source.to_dict(tables_count=len(tables))
         result['tables'] = [table.to_dict() for table in tables]
         
         return jsonify({
@@ -145,7 +160,7 @@ def update_table_info(table_id):
         
         # Update column descriptions in schema
         if 'schema_updates' in data:
-            schema = table.get_schema()
+            schema = table.schema_info or {}
             updates = data['schema_updates']
             
             for column in schema.get('columns', []):
@@ -153,7 +168,8 @@ def update_table_info(table_id):
                 if col_name in updates:
                     column['description'] = updates[col_name]
             
-            table.set_schema(schema)
+            # Nested edits aren't tracked by MutableDict
+            flag_modified(table, 'schema_info')
         
         db.session.commit()
         
@@ -331,7 +347,7 @@ def validate_table_schema(table_id):
         }
         
         # Compare stored schema with actual database schema
-        stored_schema = table.get_schema()
+        stored_schema = table.schema_info or {}
         stored_columns = {col['name']: col for col in stored_schema.get('columns', [])}
         
         for db_col in db_columns:
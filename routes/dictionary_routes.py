@@ -2,6 +2,7 @@
 from flask import Blueprint, request, jsonify, current_app
 from models import DataDictionary, Project, User, db
 from services.llm_service import LLMService
+from schemas import json_response
 from datetime import datetime
 
 dictionary_bp = Blueprint('dictionary', __name__)
@@ -29,7 +30,7 @@ def get_dictionary_entries(project_id):
                 db.or_(
                     DataDictionary.term.ilike(search_pattern),
                     DataDictionary.definition.ilike(search_pattern),
-                    DataDictionary.aliases.ilike(search_pattern)
+                    db.cast(DataDictionary.aliases, db.Text).ilike(search_pattern)
                 )
             )
         
@@ -39,17 +40,16 @@ def get_dictionary_entries(project_id):
         # Get results with ordering
         entries = query.order_by(DataDictionary.term).all()
         
-        # Group by category for better organization
+        # Group by category for better organization; each entry is built once
+        # and shared by both lists
+        entries_out = [entry.to_out() for entry in entries]
         grouped_entries = {}
-        for entry in entries:
-            category_key = entry.category
-            if category_key not in grouped_entries:
-                grouped_entries[category_key] = []
-            grouped_entries[category_key].append(entry.to_dict())
+        for entry in entries_out:
+            grouped_entries.setdefault(entry.category, []).append(entry)
         
-        return jsonify({
+        return json_response({
             'status': 'success',
-            'entries': [entry.to_dict() for entry in entries],
+            'entries': entries_out,
             'grouped_entries': grouped_entries,
             'total_count': len(entries),
             'categories': list(grouped_entries.keys())
@@ -97,11 +97,11 @@ def create_dictionary_entry(project_id):
         
         # Set optional fields
         if data.get('aliases'):
-            entry.set_aliases(data['aliases'])
+            entry.aliases = data['aliases']
         if data.get('examples'):
-            entry.set_examples(data['examples'])
+            entry.examples = data['examples']
         if data.get('tags'):
-            entry.set_tags(data['tags'])
+            entry.tags = data['tags']
         
         db.session.add(entry)
         db.session.commit()
@@ -172,11 +172,11 @@ def update_dictionary_entry(entry_id):
         
         # Update arrays
         if 'aliases' in data:
-            entry.set_aliases(data['aliases'])
+            entry.aliases = data['aliases']
         if 'examples' in data:
-            entry.set_examples(data['examples'])
+            entry.examples = data['examples']
         if 'tags' in data:
-            entry.set_tags(data['tags'])
+            entry.tags = data['tags']
         
         entry.updated_at = datetime.utcnow()
         
@@ -375,11 +375,11 @@ def import_dictionary_entries(project_id):
                     # Update existing entry
                     existing.definition = entry_data['definition']
                     if 'aliases' in entry_data:
-                        existing.set_aliases(entry_data['aliases'])
+                        existing.aliases = entry_data['aliases']
                     if 'examples' in entry_data:
-                        existing.set_examples(entry_data['examples'])
+                        existing.examples = entry_data['examples']
                     if 'tags' in entry_data:
-                        existing.set_tags(entry_data['tags'])
+                        existing.tags = entry_data['tags']
                     existing.updated_at = datetime.utcnow()
                     updated_count += 1
                 else:
@@ -400,11 +400,11 @@ def import_dictionary_entries(project_id):
                 )
                 
                 if 'aliases' in entry_data:
-                    entry.set_aliases(entry_data['aliases'])
+                    entry.aliases = entry_data['aliases']
                 if 'examples' in entry_data:
-                    entry.set_examples(entry_data['examples'])
+                    entry.examples = entry_data['examples']
                 if 'tags' in entry_data:
-                    entry.set_tags(entry_data['tags'])
+                    entry.tags = entry_data['tags']
                 
                 db.session.add(entry)
                 created_count += 1
@@ -450,10 +450,10 @@ def export_dictionary_entries(project_id):
             'project_name': project.name,
             'export_date': datetime.utcnow().isoformat(),
             'total_entries': len(entries),
-            'entries': [entry.to_dict() for entry in entries]
+            'entries': [entry.to_out() for entry in entries]
         }
         
-        return jsonify({
+        return json_response({
             'status': 'success',
             'export_data': export_data
         })
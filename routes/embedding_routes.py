@@ -1,11 +1,34 @@
 # routes/embedding_routes.py
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from models import EmbeddingModel, SearchIndex, Project, TableInfo, DataDictionary, db
 from services.embedding_service import EmbeddingService
+from services.progress_service import progress_service
+from schemas import json_response
 import threading
+import queue
+import json
+import time
 
 embedding_bp = Blueprint('embeddings', __name__)
 
+def _run_in_background(task):
+    """Start a CPU-bound task on a real OS thread"""
+    # Under the gevent worker threading.Thread is a greenlet on the hub, so
+    # encoding/FAISS builds would stall every request in the worker and miss
+    # its heartbeat; the hub's threadpool runs them on native threads instead
+    try:
+        from gevent import monkey
+        if monkey.is_module_patched('threading'):
+            import gevent
+            gevent.get_hub().threadpool.spawn(task)
+            return
+    except ImportError:
+        pass
+    
+    thread = threading.Thread(target=task)
+    thread.daemon = True
+    thread.start()
+
 @embedding_bp.route('/models/available', methods=['GET'])
 def get_available_models():
     """Get list of available embedding models"""
@@ -29,9 +52,9 @@ def get_project_models(project_id):
         project = Project.query.get_or_404(project_id)
         models = EmbeddingModel.query.filter_by(project_id=project_id).all()
         
-        return jsonify({
+        return json_response({
             'status': 'success',
-            'models': [model.to_dict() for model in models]
+            'models': [model.to_out() for model in models]
         })
         
     except Exception as e:
@@ -96,6 +119,76 @@ def get_index_status(index_id):
         current_app.logger.error(f"Get index status error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _progress_event_stream(kind, project_id, name_field, name, model_class, timeout):
+    """Yield SSE messages for one model/index until it is ready, errors or times out"""
+    subscriber = progress_service.subscribe()
+    
+    def lookup():
+        # End the read transaction so the next query sees fresh rows
+        db.session.rollback()
+        record = model_class.query.filter_by(project_id=project_id, **{name_field: name}).first()
+        return record.to_dict() if record else None
+    
+    try:
+        deadline = time.time() + timeout
+        last_payload = lookup()
+        if last_payload:
+            yield f"data: {json.dumps(last_payload)}\n\n"
+            if last_payload['status'] in ('ready', 'error'):
+                return
+        
+        while time.time() < deadline:
+            try:
+                event_kind, payload = subscriber.get(timeout=5)
+                if (event_kind != kind or payload['project_id'] != project_id
+                        or payload[name_field] != name):
+                    continue
+            except queue.Empty:
+                # Updates committed by another worker process never reach this
+                # queue, so re-read the row as a fallback heartbeat
+                payload = lookup()
+                if payload is None or payload == last_payload:
+                    yield ": keep-alive\n\n"
+                    continue
+            
+            last_payload = payload
+            yield f"data: {json.dumps(payload)}\n\n"
+            if payload['status'] in ('ready', 'error'):
+                return
+        
+        yield f"data: {json.dumps({'status': 'timeout', name_field: name})}\n\n"
+        
+    finally:
+        progress_service.unsubscribe(subscriber)
+
+@embedding_bp.route('/<int:project_id>/models/<path:model_name>/events', methods=['GET'])
+def stream_model_events(project_id, model_name):
+    """Stream model download progress as server-sent events"""
+    project = Project.query.get_or_404(project_id)
+    timeout = min(request.args.get('timeout', 300, type=int), 3600)
+    
+    return Response(
+        stream_with_context(_progress_event_stream(
+            'model', project_id, 'model_name', model_name, EmbeddingModel, timeout
+        )),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@embedding_bp.route('/<int:project_id>/indexes/<path:index_name>/events', methods=['GET'])
+def stream_index_events(project_id, index_name):
+    """Stream index build progress as server-sent events"""
+    project = Project.query.get_or_404(project_id)
+    timeout = min(request.args.get('timeout', 300, type=int), 3600)
+    
+    return Response(
+        stream_with_context(_progress_event_stream(
+            'index', project_id, 'index_name', index_name, SearchIndex, timeout
+        )),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @embedding_bp.route('/indexes/<int:index_id>', methods=['DELETE'])
 def delete_index(index_id):
     """Delete a search index"""
@@ -266,10 +359,8 @@ def download_model(project_id):
                 except Exception as e:
                     app.logger.error(f"Model download failed: {str(e)}")
         
-        # Start download thread
-        thread = threading.Thread(target=download_task)
-        thread.daemon = True
-        thread.start()
+        # Start download on a background thread
+        _run_in_background(download_task)
         
         return jsonify({
             'status': 'success',
@@ -339,8 +430,8 @@ def create_index(project_id):
             build_progress=0.0,
             is_built=False
         )
-        search_index.set_target_ids(target_ids)
-        search_index.set_build_config(config)
+        search_index.target_ids = target_ids
+        search_index.build_config = config
         
         db.session.add(search_index)
         db.session.commit()
@@ -401,10 +492,8 @@ def create_index(project_id):
                         pass  # If we can't update status, just log
                     app.logger.error(f"Index creation failed with exception: {str(e)}")
         
-        # Start creation thread
-        thread = threading.Thread(target=create_index_task)
-        thread.daemon = True
-        thread.start()
+        # Start creation on a background thread
+        _run_in_background(create_index_task)
         
         return jsonify({
             'status': 'success',
@@ -481,16 +570,16 @@ def rebuild_indexes(project_id):
                                 index.embedding_model_id,
                                 index.index_name,
                                 index.target_type,
-                                index.get_target_ids(),
-                                index.get_build_config()
+                                index.target_ids or [],
+                                index.build_config or {}
                             )
                         elif index.index_type == 'tfidf':
                             result = embedding_service.create_tfidf_index(
                                 index.project_id,
                                 index.index_name,
                                 index.target_type,
-                                index.get_target_ids(),
-                                index.get_build_config()
+                                index.target_ids or [],
+                                index.build_config or {}
                             )
                         else:
                             result = {'status': 'error', 'message': f'Unsupported index type: {index.index_type}'}
@@ -510,10 +599,8 @@ def rebuild_indexes(project_id):
                 except Exception as e:
                     app.logger.error(f"Index rebuild failed: {str(e)}")
         
-        # Start rebuild thread
-        thread = threading.Thread(target=rebuild_task)
-        thread.daemon = True
-        thread.start()
+        # Start rebuild on a background thread
+        _run_in_background(rebuild_task)
         
         return jsonify({
             'status': 'success',
@@ -1,6 +1,10 @@
 # routes/project_routes.py
 from flask import Blueprint, request, jsonify, current_app
-from models import Project, User, db
+from models import (
+    Project, DataSource, TableInfo, DataDictionary, EmbeddingModel,
+    SearchIndex, ChatHistory, User, db
+)
+from schemas import json_response
 from datetime import datetime
 
 project_bp = Blueprint('projects', __name__)
@@ -11,10 +15,31 @@ def get_projects():
     try:
         # For now, return all projects. In a real app, filter by user
         projects = Project.query.filter_by(is_active=True).all()
+        project_ids = [project.id for project in projects]
         
-        return jsonify({
+        # One GROUP BY per relationship instead of two queries per project
+        data_source_counts = dict(
+            db.session.query(DataSource.project_id, db.func.count(DataSource.id))
+            .filter(DataSource.project_id.in_(project_ids))
+            .group_by(DataSource.project_id)
+            .all()
+        )
+        table_counts = dict(
+            db.session.query(TableInfo.project_id, db.func.count(TableInfo.id))
+            .filter(TableInfo.project_id.in_(project_ids))
+            .group_by(TableInfo.project_id)
+            .all()
+        )
+        
+        return json_response({
             'status': 'success',
-            'projects': [project.to_dict() for project in projects]
+            'projects': [
+                project.to_out(counts={
+                    'data_sources': data_source_counts.get(project.id, 0),
+                    'tables': table_counts.get(project.id, 0)
+                })
+                for project in projects
+            ]
         })
         
     except Exception as e:
@@ -55,6 +80,14 @@ def create_project():
         current_app.logger.error(f"Create project error: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+def _chat_stats(project_id):
+    """Session/query/success counts in one aggregate instead of loading every ChatHistory row"""
+    return db.session.query(
+        db.func.count(db.distinct(ChatHistory.session_id)),
+        db.func.count(ChatHistory.id),
+        db.func.coalesce(db.func.sum(db.case((ChatHistory.status == 'completed', 1), else_=0)), 0)
+    ).filter(ChatHistory.project_id == project_id).one()
+
 @project_bp.route('/<int:project_id>', methods=['GET'])
 def get_project(project_id):
     """Get a specific project"""
@@ -63,13 +96,14 @@ def get_project(project_id):
         
         # Include additional statistics
         project_data = project.to_dict()
+        session_count, _, _ = _chat_stats(project_id)
         project_data['stats'] = {
-            'data_sources': len(project.data_sources),
-            'tables': len(project.table_infos),
-            'dictionary_entries': len(project.dictionary_entries),
-            'embedding_models': len(project.embedding_models),
-            'search_indexes': len(project.search_indexes),
-            'chat_sessions': len(set(chat.session_id for chat in project.chat_sessions))
+            'data_sources': project_data['data_sources_count'],
+            'tables': project_data['tables_count'],
+            'dictionary_entries': DataDictionary.query.filter_by(project_id=project_id).count(),
+            'embedding_models': EmbeddingModel.query.filter_by(project_id=project_id).count(),
+            'search_indexes': SearchIndex.query.filter_by(project_id=project_id).count(),
+            'chat_sessions': session_count
         }
         
         return jsonify({
@@ -139,50 +173,73 @@ def get_project_summary(project_id):
     """Get project summary with detailed statistics"""
     try:
         project = Project.query.get_or_404(project_id)
+        data_sources = project.data_sources.all()
+        
+        # Read-only aggregates: fetch just the columns used as plain Row tuples
+        # rather than hydrating full ORM objects (and their JSON columns)
+        table_infos = db.session.query(
+            TableInfo.table_name, TableInfo.row_count, TableInfo.column_count, TableInfo.data_source_id
+        ).filter(TableInfo.project_id == project_id).all()
+        dictionary_rows = db.session.query(
+            DataDictionary.category, DataDictionary.is_verified
+        ).filter(DataDictionary.project_id == project_id).all()
+        model_statuses = [
+            status for (status,) in
+            db.session.query(EmbeddingModel.status).filter(EmbeddingModel.project_id == project_id)
+        ]
+        session_count, query_count, successful_count = _chat_stats(project_id)
         
         # Calculate detailed statistics
         summary = {
-            'project': project.to_dict(),
+            'project': project.to_dict(counts={
+                'data_sources': len(data_sources),
+                'tables': len(table_infos)
+            }),
             'data_sources': {
-                'total': len(project.data_sources),
+                'total': len(data_sources),
                 'by_type': {},
                 'recent': []
             },
             'tables': {
-                'total': len(project.table_infos),
-                'total_rows': sum(table.row_count for table in project.table_infos),
-                'total_columns': sum(table.column_count for table in project.table_infos),
+                'total': len(table_infos),
+                'total_rows': sum(table.row_count for table in table_infos),
+                'total_columns': sum(table.column_count for table in table_infos),
                 'largest_table': None
             },
             'dictionary': {
-                'total': len(project.dictionary_entries),
+                'total': len(dictionary_rows),
                 'by_category': {},
-                'verified_count': sum(1 for entry in project.dictionary_entries if entry.is_verified)
+                'verified_count': sum(1 for entry in dictionary_rows if entry.is_verified)
             },
             'embeddings': {
-                'total': len(project.embedding_models),
-                'ready_count': sum(1 for model in project.embedding_models if model.status == 'ready'),
-                'indexes_count': len(project.search_indexes)
+                'total': len(model_statuses),
+                'ready_count': sum(1 for status in model_statuses if status == 'ready'),
+                'indexes_count': SearchIndex.query.filter_by(project_id=project_id).count()
             },
             'chat': {
-                'total_sessions': len(set(chat.session_id for chat in project.chat_sessions)),
-                'total_queries': len(project.chat_sessions),
-                'successful_queries': sum(1 for chat in project.chat_sessions if chat.status == 'completed')
+                'total_sessions': session_count,
+                'total_queries': query_count,
+                'successful_queries': int(successful_count)
             }
         }
         
         # Data sources by type
-        for ds in project.data_sources:
+        for ds in data_sources:
             ds_type = ds.source_type
             summary['data_sources']['by_type'][ds_type] = summary['data_sources']['by_type'].get(ds_type, 0) + 1
         
         # Recent data sources
-        recent_ds = sorted(project.data_sources, key=lambda x: x.created_at, reverse=True)[:5]
-        summary['data_sources']['recent'] = [ds.to_dict() for ds in recent_ds]
+        recent_ds = sorted(data_sources, key=lambda x: x.created_at, reverse=True)[:5]
+        tables_per_source = {}
+        for table in table_infos:
+            tables_per_source[table.data_source_id] = tables_per_source.get(table.data_source_id, 0) + 1
+        summary['data_sources']['recent'] = [
+            ds.to_dict(tables_count=tables_per_source.get(ds.id, 0)) for ds in recent_ds
+        ]
         
         # Largest table
-        if project.table_infos:
-            largest = max(project.table_infos, key=lambda x: x.row_count)
+        if table_infos:
+            largest = max(table_infos, key=lambda x: x.row_count)
             summary['tables']['largest_table'] = {
                 'name': largest.table_name,
                 'rows': largest.row_count,
@@ -190,7 +247,7 @@ def get_project_summary(project_id):
             }
         
         # Dictionary by category
-        for entry in project.dictionary_entries:
+        for entry in dictionary_rows:
             category = entry.category
             summary['dictionary']['by_category'][category] = summary['dictionary']['by_category'].get(category, 0) + 1
         
@@ -65,13 +65,19 @@ def start_production():
     """Start application in production mode"""
     print("🚀 Starting QueryForge in production mode...")
     
-    # Check if gunicorn is available
+    # Check if gunicorn and gevent are available
     try:
         import gunicorn
     except ImportError:
         print("❌ Error: gunicorn not installed. Installing...")
         subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'gunicorn'])
     
+    try:
+        import gevent
+    except ImportError:
+        print("❌ Error: gevent not installed. Installing...")
+        subprocess.check_call([sys.executable, '-m', 'pip', 'install', 'gevent'])
+    
     # Start with gunicorn
     env = os.environ.copy()
     env['FLASK_ENV'] = 'production'
@@ -79,10 +85,7 @@ def start_production():
     try:
         subprocess.run([
             'gunicorn',
-            '-w', '4',
-            '-b', '0.0.0.0:5000',
-            '--timeout', '120',
-            '--keep-alive', '5',
+            '-c', 'gunicorn_conf.py',
             'app:app'
         ], env=env)
     except KeyboardInterrupt:
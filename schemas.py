@@ -0,0 +1,122 @@
+# schemas.py
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import msgspec
+from flask import Response
+
+# Typed mirrors of the models' to_dict() output. List endpoints build these
+# and msgspec encodes the whole response in one C pass instead of a dict per
+# row followed by json.dumps.
+
+class ProjectOut(msgspec.Struct):
+    id: int
+    name: str
+    description: Optional[str]
+    created_by: int
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    is_active: Optional[bool]
+    data_sources_count: int
+    tables_count: int
+
+class DataSourceOut(msgspec.Struct):
+    id: int
+    project_id: int
+    name: str
+    source_type: str
+    file_name: Optional[str]
+    file_size: Optional[int]
+    status: Optional[str]
+    error_message: Optional[str]
+    created_at: Optional[datetime]
+    tables_count: int
+
+class TableInfoOut(msgspec.Struct):
+    id: int
+    project_id: int
+    data_source_id: int
+    table_name: str
+    original_name: Optional[str]
+    schema_info: Dict[str, Any]
+    row_count: Optional[int]
+    column_count: Optional[int]
+    sample_data: List[Any]
+    description: Optional[str]
+    created_at: Optional[datetime]
+
+class DataDictionaryOut(msgspec.Struct):
+    id: int
+    project_id: int
+    term: str
+    definition: str
+    category: str
+    source_table: Optional[str]
+    source_column: Optional[str]
+    aliases: List[Any]
+    examples: List[Any]
+    tags: List[Any]
+    confidence_score: float
+    is_verified: Optional[bool]
+    created_at: Optional[datetime]
+
+class EmbeddingModelOut(msgspec.Struct):
+    id: int
+    project_id: int
+    model_name: str
+    model_type: str
+    embedding_dimension: Optional[int]
+    is_downloaded: Optional[bool]
+    is_active: Optional[bool]
+    download_progress: float
+    status: Optional[str]
+    error_message: Optional[str]
+    created_at: Optional[datetime]
+
+class SearchIndexOut(msgspec.Struct):
+    id: int
+    project_id: int
+    embedding_model_id: int
+    index_name: str
+    index_type: str
+    target_type: str
+    target_ids: List[Any]
+    vector_count: Optional[int]
+    is_built: Optional[bool]
+    build_progress: float
+    status: Optional[str]
+    error_message: Optional[str]
+    build_config: Dict[str, Any]
+    created_at: Optional[datetime]
+
+class ChatHistoryOut(msgspec.Struct):
+    id: int
+    project_id: int
+    session_id: str
+    user_query: str
+    extracted_entities: List[Any]
+    entity_mappings: Dict[str, Any]
+    selected_tables: List[Any]
+    generated_sql: Optional[str]
+    sql_results: List[Any]
+    final_response: Optional[str]
+    user_feedback: Optional[str]
+    confirmation_steps: Dict[str, Any]
+    processing_time: float
+    status: Optional[str]
+    error_message: Optional[str]
+    created_at: Optional[datetime]
+
+class UserOut(msgspec.Struct):
+    id: int
+    username: str
+    email: str
+    role: Optional[str]
+    is_active: Optional[bool]
+    last_login: Optional[datetime]
+    created_at: Optional[datetime]
+
+_json_encoder = msgspec.json.Encoder()
+
+def json_response(payload, status=200):
+    """Encode a payload that may contain *Out structs straight to a JSON response"""
+    return Response(_json_encoder.encode(payload), status=status, mimetype='application/json')
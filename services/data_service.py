@@ -76,6 +76,15 @@ class DataService:
                 "message": str(e)
             }
     
+    def process_uploaded_files(self, files: List[Tuple[str, str]],
+                               project_id: int) -> List[Dict[str, Any]]:
+        """Process several uploaded (file_path, filename) pairs for one project"""
+        # Each file keeps its own commits so one bad file doesn't undo the rest
+        return [
+            self.process_uploaded_file(file_path, project_id, filename)
+            for file_path, filename in files
+        ]
+    
     def _process_csv(self, file_path: str, project_id: int, 
                     data_source_id: int) -> Dict[str, Any]:
         """Process CSV file"""
@@ -369,8 +378,8 @@ class DataService:
             )
             
             # Set schema and sample data using the model methods
-            table_info.set_schema(schema)
-            table_info.set_sample_data(sample_data)
+            table_info.schema_info = schema
+            table_info.sample_data = sample_data
             
             db.session.add(table_info)
             db.session.commit()
@@ -451,7 +460,7 @@ class DataService:
                 }
             
             for table in tables:
-                schema = table.get_schema() if hasattr(table, 'get_schema') else {}
+                schema = table.schema_info or {}
                 
                 # Generate table-level entry
                 table_entry = DataDictionary(
@@ -536,8 +545,8 @@ class DataService:
                     
                     # Set examples from sample values
                     sample_values = column.get('sample_values', [])
-                    if sample_values and hasattr(col_entry, 'set_examples'):
-                        col_entry.set_examples([str(v) for v in sample_values[:3]])
+                    if sample_values:
+                        col_entry.examples = [str(v) for v in sample_values[:3]]
                     
                     # Check if entry already exists
                     existing_col = DataDictionary.query.filter_by(
@@ -3,15 +3,68 @@ import os
 import json
 import numpy as np
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from sentence_transformers import SentenceTransformer
-import faiss
+from typing import Dict, List, Any, Optional, Tuple, TYPE_CHECKING
 import pickle
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import time
+from collections import namedtuple
+from functools import lru_cache
 from flask import current_app
+from sqlalchemy import event
 from models import EmbeddingModel, SearchIndex, TableInfo, DataDictionary, db
 
+# sentence-transformers (torch), faiss and sklearn are imported where they are
+# used so that importing this module doesn't pay their start-up cost
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+# Read-through caches for the model/index rows consulted on every search.
+# Local writes invalidate them on commit; the TTL bucket in the key bounds
+# staleness for writes made by other worker processes.
+METADATA_CACHE_TTL = 30
+
+EmbeddingModelMeta = namedtuple(
+    'EmbeddingModelMeta', 'id model_path model_type is_downloaded status'
+)
+SearchIndexMeta = namedtuple(
+    'SearchIndexMeta', 'id embedding_model_id index_type index_path is_built'
+)
+
+def _ttl_bucket():
+    return int(time.monotonic() // METADATA_CACHE_TTL)
+
+@lru_cache(maxsize=256)
+def _embedding_model_meta(model_id: int, bucket: int) -> Optional[EmbeddingModelMeta]:
+    row = db.session.query(
+        EmbeddingModel.id, EmbeddingModel.model_path, EmbeddingModel.model_type,
+        EmbeddingModel.is_downloaded, EmbeddingModel.status
+    ).filter(EmbeddingModel.id == model_id).first()
+    return EmbeddingModelMeta(*row) if row else None
+
+@lru_cache(maxsize=256)
+def _search_index_meta(index_id: int, bucket: int) -> Optional[SearchIndexMeta]:
+    row = db.session.query(
+        SearchIndex.id, SearchIndex.embedding_model_id, SearchIndex.index_type,
+        SearchIndex.index_path, SearchIndex.is_built
+    ).filter(SearchIndex.id == index_id).first()
+    return SearchIndexMeta(*row) if row else None
+
+@event.listens_for(db.session, 'after_flush')
+def _mark_metadata_changes(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (EmbeddingModel, SearchIndex)):
+            session.info['metadata_changed'] = True
+            return
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_metadata_caches(session):
+    if session.info.pop('metadata_changed', False):
+        _embedding_model_meta.cache_clear()
+        _search_index_meta.cache_clear()
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_metadata_changes(session):
+    session.info.pop('metadata_changed', None)
+
 class EmbeddingService:
     def __init__(self):
         self.models_cache = {}
@@ -96,6 +149,8 @@ class EmbeddingService:
             if model_name.startswith('sentence-transformers/'):
                 # Download sentence transformer model
                 try:
+                    from sentence_transformers import SentenceTransformer
+                    
                     current_app.logger.info(f"Downloading model: {model_name}")
                     model = SentenceTransformer(model_name, cache_folder=self.models_dir)
                     
@@ -131,7 +186,7 @@ class EmbeddingService:
             current_app.logger.error(f"Model download error: {str(e)}")
             return {"status": "error", "message": str(e)}
     
-    def load_model(self, model_id: int) -> Optional[SentenceTransformer]:
+    def load_model(self, model_id: int) -> Optional['SentenceTransformer']:
         """Load embedding model from local storage"""
         try:
             if model_id in self.models_cache:
@@ -142,6 +197,7 @@ class EmbeddingService:
                 return None
             
             if embedding_model.model_type == 'sentence-transformers':
+                from sentence_transformers import SentenceTransformer
                 model = SentenceTransformer(embedding_model.model_path)
                 self.models_cache[model_id] = model
                 return model
@@ -169,7 +225,7 @@ class EmbeddingService:
     def search_index(self, index_id: int, query: str, top_k: int = 10) -> List[Dict[str, Any]]:
         """Search in a specific index"""
         try:
-            search_index = SearchIndex.query.get(index_id)
+            search_index = _search_index_meta(index_id, _ttl_bucket())
             if not search_index or not search_index.is_built:
                 return []
             
@@ -184,10 +240,12 @@ class EmbeddingService:
             current_app.logger.error(f"Index search error: {str(e)}")
             return []
     
-    def _search_faiss_index(self, search_index: SearchIndex, query: str, 
+    def _search_faiss_index(self, search_index: SearchIndexMeta, query: str, 
                            top_k: int) -> List[Dict[str, Any]]:
         """Search FAISS index"""
         try:
+            import faiss
+            
             # Load FAISS index
             faiss_index = faiss.read_index(search_index.index_path)
             
@@ -222,10 +280,12 @@ class EmbeddingService:
             current_app.logger.error(f"FAISS search error: {str(e)}")
             return []
     
-    def _search_tfidf_index(self, search_index: SearchIndex, query: str, 
+    def _search_tfidf_index(self, search_index: SearchIndexMeta, query: str, 
                            top_k: int) -> List[Dict[str, Any]]:
         """Search TF-IDF index"""
         try:
+            from sklearn.metrics.pairwise import cosine_similarity
+            
             # Load TF-IDF index
             with open(search_index.index_path, 'rb') as f:
                 index_data = pickle.load(f)
@@ -299,8 +359,8 @@ class EmbeddingService:
                     target_type=target_type,
                     status='building'
                 )
-                search_index.set_target_ids(target_ids)
-                search_index.set_build_config(config or {})
+                search_index.target_ids = target_ids
+                search_index.build_config = config or {}
                 db.session.add(search_index)
                 db.session.commit()
             
@@ -414,8 +474,8 @@ class EmbeddingService:
                     target_type=target_type,
                     status='building'
                 )
-                search_index.set_target_ids(target_ids)
-                search_index.set_build_config(config or {})
+                search_index.target_ids = target_ids
+                search_index.build_config = config or {}
                 db.session.add(search_index)
                 db.session.commit()
             
@@ -492,13 +552,13 @@ class EmbeddingService:
                 pass
             return {"status": "error", "message": str(e)}
 
-    def load_model(self, model_id: int) -> Optional[SentenceTransformer]:
+    def load_model(self, model_id: int) -> Optional['SentenceTransformer']:
         """Load embedding model from local storage with better error handling"""
         try:
             if model_id in self.models_cache:
                 return self.models_cache[model_id]
             
-            embedding_model = EmbeddingModel.query.get(model_id)
+            embedding_model = _embedding_model_meta(model_id, _ttl_bucket())
             if not embedding_model:
                 current_app.logger.error(f"Embedding model {model_id} not found in database")
                 return None
@@ -512,6 +572,8 @@ class EmbeddingService:
                 return None
             
             if embedding_model.model_type == 'sentence-transformers':
+                from sentence_transformers import SentenceTransformer
+                
                 current_app.logger.info(f"Loading SentenceTransformer model from: {embedding_model.model_path}")
                 model = SentenceTransformer(embedding_model.model_path)
                 self.models_cache[model_id] = model
@@ -549,7 +611,7 @@ class EmbeddingService:
                         text += f" - {table.description}"
                     
                     # Add column information
-                    schema = table.get_schema()
+                    schema = table.schema_info or {}
                     if schema and 'columns' in schema:
                         column_names = [col.get('name', '') for col in schema['columns']]
                         if column_names:
@@ -599,7 +661,7 @@ class EmbeddingService:
                 current_app.logger.info(f"Found {len(tables)} tables for column indexing")
                 
                 for table in tables:
-                    schema = table.get_schema()
+                    schema = table.schema_info or {}
                     if schema and 'columns' in schema:
                         for column in schema['columns']:
                             col_name = column.get('name', '')
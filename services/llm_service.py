@@ -1,10 +1,39 @@
 # services/llm_service.py
-import os
 import json
+import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Any, Optional
+import orjson
 from openai import AzureOpenAI
 from flask import current_app
+from config import AZURE_API_KEY, AZURE_ENDPOINT, AZURE_API_VERSION, AZURE_DEPLOYMENT, LLM_MAX_CONCURRENCY
+
+# Shared by every LLMService in the process; caps concurrent completion calls
+_completion_slots = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+
+# Completions cached by request hash when LLM_RESPONSE_CACHE is on:
+# key -> (content, expires_at), least recently used first
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+
+def _completion_key(deployment: str, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+    """sha256 over length-prefixed request parts so field boundaries can't collide"""
+    digest = hashlib.sha256()
+    for part in (
+        deployment.encode('utf-8'),
+        orjson.dumps(messages),
+        orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
+    ):
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+def _canonical_json(obj: Any) -> str:
+    """Deterministic JSON (sorted keys) for prompt sections that should stay byte-identical"""
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_INDENT_2).decode('utf-8')
 
 class LLMService:
     def __init__(self):
@@ -15,9 +44,9 @@ class LLMService:
     def _initialize_client(self):
         """Initialize Azure OpenAI client"""
         try:
-            api_key = os.environ.get('AZURE_OPENAI_API_KEY') or self.config.get('api_key')
-            endpoint = os.environ.get('AZURE_OPENAI_ENDPOINT') or self.config.get('endpoint')
-            api_version = os.environ.get('AZURE_OPENAI_API_VERSION') or self.config.get('api_version')
+            api_key = AZURE_API_KEY
+            endpoint = AZURE_ENDPOINT
+            api_version = AZURE_API_VERSION
             
             if not api_key or api_key == 'your-azure-openai-api-key':
                 current_app.logger.warning("Azure OpenAI API key not configured")
@@ -33,7 +62,7 @@ class LLMService:
                 azure_endpoint=endpoint
             )
             
-            self.deployment_name = os.environ.get('AZURE_OPENAI_DEPLOYMENT') or self.config.get('deployment_name', 'gpt-4')
+            self.deployment_name = AZURE_DEPLOYMENT
             current_app.logger.info("Azure OpenAI client initialized successfully")
             
         except Exception as e:
@@ -44,6 +73,36 @@ class LLMService:
         """Check if LLM service is available"""
         return self.client is not None
     
+    def _create_completion(self, messages: List[Dict[str, str]], params: Dict[str, Any]) -> str:
+        """Call the deployment once a concurrency slot is free"""
+        with _completion_slots:
+            response = self.client.chat.completions.create(
+                model=self.deployment_name, messages=messages, **params
+            )
+        return response.choices[0].message.content
+    
+    def _complete(self, messages: List[Dict[str, str]], **params) -> str:
+        """Run a chat completion, reusing the answer to an identical earlier request if caching is on"""
+        config = current_app.config
+        if not config.get('LLM_RESPONSE_CACHE'):
+            return self._create_completion(messages, params)
+        
+        key = _completion_key(self.deployment_name, messages, params)
+        with _response_cache_lock:
+            cached = _response_cache.get(key)
+            if cached and cached[1] > time.monotonic():
+                _response_cache.move_to_end(key)
+                return cached[0]
+        
+        content = self._create_completion(messages, params)
+        
+        with _response_cache_lock:
+            _response_cache[key] = (content, time.monotonic() + config['LLM_RESPONSE_CACHE_TTL'])
+            _response_cache.move_to_end(key)
+            while len(_response_cache) > config['LLM_RESPONSE_CACHE_SIZE']:
+                _response_cache.popitem(last=False)
+        return content
+    
     def extract_entities(self, query: str, schema_context: Dict[str, Any]) -> Dict[str, Any]:
         """Extract entities from natural language query"""
         if not self.is_available():
@@ -59,17 +118,17 @@ class LLMService:
             dictionary_terms = [term.get('term', '') for term in schema_context.get('dictionary', [])]
             
             # Use prompt template from config
-            prompt = current_app.config['PROMPTS']['entity_extraction'].format(
+            prompts = current_app.config['PROMPTS']
+            prompt = prompts['entity_extraction_user'].format(
                 query=query,
                 tables=', '.join(tables[:20]),  # Limit to avoid token overflow
                 columns=', '.join(columns[:50]),  # Limit to avoid token overflow
                 dictionary_terms=', '.join(dictionary_terms[:30])  # Limit to avoid token overflow
             )
             
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert data analyst. Extract entities from queries and return valid JSON."},
+            content = self._complete(
+                [
+                    {"role": "system", "content": prompts['entity_extraction_system']},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=self.config.get('max_tokens', 2000),
@@ -77,7 +136,6 @@ class LLMService:
                 response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content
             result = json.loads(content)
             
             # Ensure we have the expected format
@@ -103,18 +161,24 @@ class LLMService:
         
         try:
             # Use prompt template from config
-            prompt = current_app.config['PROMPTS']['sql_generation'].format(
+            # Instructions, then the schema block, then per-query data: the
+            # schema is serialized canonically so repeat queries against the
+            # same tables share a byte-identical prefix
+            prompts = current_app.config['PROMPTS']
+            schema_prompt = prompts['sql_generation_schema'].format(
+                schema=_canonical_json(schema),
+                relationships=_canonical_json(relationships or [])
+            )
+            prompt = prompts['sql_generation_user'].format(
                 query=query,
                 entities=json.dumps(entities, indent=2),
-                mappings=json.dumps(mappings, indent=2),
-                schema=json.dumps(schema, indent=2),
-                relationships=json.dumps(relationships or [], indent=2)
+                mappings=json.dumps(mappings, indent=2)
             )
             
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": "You are an expert SQL developer. Generate safe SELECT queries and return valid JSON."},
+            content = self._complete(
+                [
+                    {"role": "system", "content": prompts['sql_generation_system']},
+                    {"role": "system", "content": schema_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=self.config.get('max_tokens', 2000),
@@ -122,7 +186,6 @@ class LLMService:
                 response_format={"type": "json_object"}
             )
             
-            content = response.choices[0].message.content
             result = json.loads(content)
             
             # Validate the response
@@ -151,13 +214,35 @@ class LLMService:
             current_app.logger.error(f"SQL generation error: {str(e)}")
             return {"error": str(e), "sql": "", "confidence": 0.0}
     
-    def generate_final_response(self, query: str, sql_query: str, results: List[Dict]) -> Dict[str, Any]:
-        """Generate natural language response from query results"""
+    def _final_response_messages(self, query: str, sql_query: str, results: List[Dict],
+                                 total_results: int) -> List[Dict[str, str]]:
+        """Build the answer prompt; only a small sample of rows goes to the model"""
+        # Limit results for context (to avoid token overflow)
+        sample_results = results[:5] if len(results) > 5 else results
+        
+        # Use prompt template from config
+        prompts = current_app.config['PROMPTS']
+        prompt = prompts['response_generation_user'].format(
+            query=query,
+            sql_query=sql_query,
+            results=json.dumps(sample_results, indent=2),
+            total_results=total_results
+        )
+        return [
+            {"role": "system", "content": prompts['response_generation_system']},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def generate_final_response(self, query: str, sql_query: str, results: List[Dict],
+                                total_results: int = None) -> Dict[str, Any]:
+        """Generate natural language response from query results (a preview when total_results is given)"""
+        if total_results is None:
+            total_results = len(results)
         if not self.is_available():
             # Fallback response when LLM is not available
             if results:
                 return {
-                    "response": f"Found {len(results)} results for your query. The data shows the requested information from your database.",
+                    "response": f"Found {total_results} results for your query. The data shows the requested information from your database.",
                     "confidence": 0.5
                 }
             else:
@@ -167,28 +252,11 @@ class LLMService:
                 }
         
         try:
-            # Limit results for context (to avoid token overflow)
-            sample_results = results[:5] if len(results) > 5 else results
-            
-            # Use prompt template from config
-            prompt = current_app.config['PROMPTS']['response_generation'].format(
-                query=query,
-                sql_query=sql_query,
-                results=json.dumps(sample_results, indent=2),
-                total_results=len(results)
-            )
-            
-            response = self.client.chat.completions.create(
-                model=self.deployment_name,
-                messages=[
-                    {"role": "system", "content": "You are a helpful data analyst. Provide clear, concise answers based on query results."},
-                    {"role": "user", "content": prompt}
-                ],
+            content = self._complete(
+                self._final_response_messages(query, sql_query, results, total_results),
                 max_tokens=self.config.get('max_tokens', 1000),
                 temperature=self.config.get('temperature', 0.1)
-            )
-            
-            content = response.choices[0].message.content.strip()
+            ).strip()
             
             return {
                 "response": content,
@@ -213,6 +281,28 @@ class LLMService:
                     "error": str(e)
                 }
     
+    def generate_final_response_stream(self, query: str, sql_query: str, results: List[Dict],
+                                       total_results: int = None) -> Iterator[str]:
+        """Yield the natural language answer piece by piece as the model produces it"""
+        if total_results is None:
+            total_results = len(results)
+        if not self.is_available():
+            yield self.generate_final_response(query, sql_query, results, total_results)['response']
+            return
+        
+        # Holds a concurrency slot until the stream is exhausted or closed
+        with _completion_slots:
+            stream = self.client.chat.completions.create(
+                model=self.deployment_name,
+                messages=self._final_response_messages(query, sql_query, results, total_results),
+                max_tokens=self.config.get('max_tokens', 1000),
+                temperature=self.config.get('temperature', 0.1),
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
     def analyze_query_intent(self, query: str) -> Dict[str, Any]:
         """Analyze the intent and complexity of a natural language query"""
         if not self.is_available():
@@ -0,0 +1,59 @@
+# services/progress_service.py
+import queue
+import threading
+from typing import Dict, Any, Tuple
+from sqlalchemy import event
+from models import EmbeddingModel, SearchIndex, db
+
+class ProgressService:
+    """In-process fan-out of embedding model / search index status changes"""
+
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> queue.Queue:
+        """Register a new subscriber queue"""
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: queue.Queue):
+        """Remove a subscriber queue"""
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, kind: str, payload: Dict[str, Any]):
+        """Push an update to every subscriber"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.put((kind, payload))
+
+progress_service = ProgressService()
+
+_TRACKED_MODELS = {
+    EmbeddingModel: 'model',
+    SearchIndex: 'index'
+}
+
+def _snapshot(obj) -> Tuple[str, Dict[str, Any]]:
+    return _TRACKED_MODELS[type(obj)], obj.to_dict()
+
+@event.listens_for(db.session, 'after_flush')
+def _collect_progress_updates(session, flush_context):
+    # Snapshot now: after_commit can't load expired attributes
+    pending = session.info.setdefault('progress_updates', [])
+    for obj in list(session.new) + list(session.dirty):
+        if type(obj) in _TRACKED_MODELS:
+            pending.append(_snapshot(obj))
+
+@event.listens_for(db.session, 'after_commit')
+def _publish_progress_updates(session):
+    for kind, payload in session.info.pop('progress_updates', []):
+        progress_service.publish(kind, payload)
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_progress_updates(session):
+    session.info.pop('progress_updates', None)
@@ -1,16 +1,68 @@
 # services/search_service.py
 import os
 import re
+import copy
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from difflib import SequenceMatcher
 from fuzzywuzzy import fuzz, process
 import sqlite3
+from contextlib import closing
+from functools import lru_cache
 from flask import current_app
 from models import SearchIndex, TableInfo, DataDictionary, db
 from services.embedding_service import EmbeddingService
 
+# Schema contexts are rebuilt on every chat step otherwise. The cache key includes
+# a version stamp read from the database (row counts and latest updated_at of the
+# project's tables and dictionary entries), so uploads and schema edits made by
+# any worker process are picked up on the next call
+SCHEMA_CONTEXT_CACHE_SIZE = 256
+
+# Results larger than a chat preview are counted in SQLite rather than fetched,
+# and the count stops at RESULT_COUNT_LIMIT rows
+RESULT_COUNT_LIMIT = 100000
+
+def _schema_version(project_id: int) -> tuple:
+    """Cheap stamp that changes whenever a project's tables or dictionary entries do"""
+    tables = db.session.query(
+        db.func.count(TableInfo.id), db.func.max(TableInfo.updated_at)
+    ).filter(TableInfo.project_id == project_id)
+    entries = db.session.query(
+        db.func.count(DataDictionary.id), db.func.max(DataDictionary.updated_at)
+    ).filter(DataDictionary.project_id == project_id)
+    return tuple(tables.one()) + tuple(entries.one())
+
+@lru_cache(maxsize=SCHEMA_CONTEXT_CACHE_SIZE)
+def _schema_context(project_id: int, table_ids: Tuple[int, ...], version: tuple) -> Dict[str, Any]:
+    query = TableInfo.query.filter_by(project_id=project_id)
+    if table_ids:
+        query = query.filter(TableInfo.id.in_(table_ids))
+    
+    context = {
+        'tables': {},
+        'relationships': [],
+        'dictionary': []
+    }
+    
+    # Build table schemas
+    for table in query.all():
+        schema = table.schema_info or {}
+        context['tables'][table.table_name] = {
+            'id': table.id,
+            'columns': schema.get('columns', []),
+            'description': table.description,
+            'row_count': table.row_count,
+            'sample_data': (table.sample_data or [])[:3]  # Limit sample data
+        }
+    
+    # Get dictionary terms
+    dict_entries = DataDictionary.query.filter_by(project_id=project_id).all()
+    context['dictionary'] = [entry.to_dict() for entry in dict_entries]
+    
+    return context
+
 class SearchService:
     def __init__(self):
         self.embedding_service = EmbeddingService()
@@ -67,6 +119,41 @@ class SearchService:
             current_app.logger.error(f"Entity search error: {str(e)}")
             return results
 
+    def refine_mappings(self, project_id: int, query: str, seed_results: Dict[str, Any],
+                        entities: List[Dict[str, Any]], search_config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Merge a search seeded with the raw query with searches for the extracted entities"""
+        config = search_config or {}
+        results = {key: list(value) for key, value in seed_results.items() if key != 'combined_results'}
+        
+        try:
+            # Entities quoted from the query were already covered by the seed's
+            # semantic and fuzzy passes; only the rest need the full search
+            query_lower = query.lower()
+            uncovered = []
+            for entity in entities:
+                entity_text = entity.get('text', '')
+                if entity_text and entity_text.lower() in query_lower:
+                    results['exact_results'].extend(self._exact_search(
+                        project_id, entity_text, entity.get('type', 'unknown'), config
+                    ))
+                else:
+                    uncovered.append(entity)
+            
+            if uncovered:
+                entity_results = self.search_entities(project_id, query, uncovered, config)
+                for key, matches in entity_results.items():
+                    if key != 'combined_results':
+                        results.setdefault(key, []).extend(matches)
+            
+            results['combined_results'] = self._combine_and_rank_results(
+                results, entities, config
+            )
+            return results
+            
+        except Exception as e:
+            current_app.logger.error(f"Mapping refinement error: {str(e)}")
+            return seed_results
+
     def search_by_method(self, project_id: int, query: str, method: str,
                         config: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Search using a specific method"""
@@ -195,7 +282,7 @@ class SearchService:
                 tables = TableInfo.query.filter_by(project_id=project_id).all()
                 
                 for table in tables:
-                    schema = table.get_schema()
+                    schema = table.schema_info or {}
                     columns = schema.get('columns', [])
                     
                     for column in columns:
@@ -279,7 +366,7 @@ class SearchService:
                 column_data = []
                 
                 for table in tables:
-                    schema = table.get_schema()
+                    schema = table.schema_info or {}
                     columns = schema.get('columns', [])
                     for column in columns:
                         column_data.append((column.get('name', ''), table.id, table.table_name, column.get('name', '')))
@@ -365,7 +452,7 @@ class SearchService:
                 tables = TableInfo.query.filter_by(project_id=project_id).all()
                 
                 for table in tables:
-                    schema = table.get_schema()
+                    schema = table.schema_info or {}
                     columns = schema.get('columns', [])
                     
                     for column in columns:
@@ -418,7 +505,7 @@ class SearchService:
                     
                     # Search in aliases if available
                     try:
-                        aliases = entry.get_aliases() if hasattr(entry, 'get_aliases') else []
+                        aliases = entry.aliases or []
                         for alias in aliases:
                             if query_lower in alias.lower():
                                 score = 0.9 if query_lower == alias.lower() else 0.7
@@ -521,57 +608,90 @@ class SearchService:
             return []
 
     def get_table_schema_context(self, project_id: int, table_ids: List[int] = None) -> Dict[str, Any]:
-        """Get schema context for tables in a project"""
+        """Get schema context for tables in a project (a private copy of the cached one)"""
         try:
-            query = TableInfo.query.filter_by(project_id=project_id)
-            if table_ids:
-                query = query.filter(TableInfo.id.in_(table_ids))
-            
-            tables = query.all()
-            
-            context = {
-                'tables': {},
-                'relationships': [],
-                'dictionary': []
-            }
-            
-            # Build table schemas
-            for table in tables:
-                schema = table.get_schema()
-                context['tables'][table.table_name] = {
-                    'id': table.id,
-                    'columns': schema.get('columns', []),
-                    'description': table.description,
-                    'row_count': table.row_count,
-                    'sample_data': table.get_sample_data()[:3]  # Limit sample data
-                }
-            
-            # Get dictionary terms
-            dict_entries = DataDictionary.query.filter_by(project_id=project_id).all()
-            context['dictionary'] = [entry.to_dict() for entry in dict_entries]
-            
-            return context
+            table_key = tuple(sorted({i for i in table_ids if i is not None})) if table_ids else ()
+            return copy.deepcopy(_schema_context(project_id, table_key, _schema_version(project_id)))
             
         except Exception as e:
             current_app.logger.error(f"Schema context error: {str(e)}")
             return {'tables': {}, 'relationships': [], 'dictionary': []}
 
+    def _validate_select_sql(self, sql_query: str) -> Optional[str]:
+        """Return an error message unless the query is a plain SELECT"""
+        sql_lower = sql_query.lower().strip()
+        
+        # Only allow SELECT statements
+        if not sql_lower.startswith('select'):
+            return 'Only SELECT statements are allowed'
+        
+        # Prevent dangerous operations
+        dangerous_keywords = ['drop', 'delete', 'insert', 'update', 'alter', 'create', 'truncate']
+        if any(keyword in sql_lower for keyword in dangerous_keywords):
+            return 'Dangerous SQL operations are not allowed'
+        
+        return None
+
+    def iter_sql_query(self, project_id: int, sql_query: str,
+                       batch_size: int = 1000) -> Tuple[List[str], Iterator[tuple]]:
+        """Execute a SELECT and return its columns plus a lazy row iterator"""
+        error = self._validate_select_sql(sql_query)
+        if error:
+            raise ValueError(error)
+        
+        # Uploaded tables live in the project's own database file, not the app DB
+        db_path = os.path.abspath(os.path.join(os.getcwd(), 'uploads', f'project_{project_id}.db'))
+        if not os.path.exists(db_path):
+            raise ValueError(f'Project database not found: {db_path}')
+        
+        # The connection lives inside the generator, so closing or dropping the
+        # iterator closes it even if the rows are never consumed
+        def rows():
+            with closing(sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)) as conn:
+                cursor = conn.execute(sql_query)
+                yield [description[0] for description in cursor.description]
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    yield from batch
+        
+        row_iter = rows()
+        columns = next(row_iter)
+        return columns, row_iter
+
+    def _collect_rows(self, fetchmany, columns, sql_query, preview_rows, count_rows):
+        """Return (rows as dicts, row_count, exact); only preview_rows rows are fetched when set"""
+        if preview_rows is None:
+            rows = fetchmany()
+            return [dict(zip(columns, row)) for row in rows], len(rows), True
+        
+        rows = fetchmany(preview_rows + 1)
+        results = [dict(zip(columns, row)) for row in rows[:preview_rows]]
+        if len(rows) <= preview_rows:
+            return results, len(rows), True
+        
+        # More rows than the preview: count them without pulling them into Python.
+        # The newline keeps a trailing line comment from swallowing the paren
+        body = sql_query.strip().rstrip(';')
+        count_sql = f"SELECT COUNT(*) FROM (SELECT 1 FROM (\n{body}\n) LIMIT {RESULT_COUNT_LIMIT})"
+        try:
+            row_count = count_rows(count_sql)
+        except Exception as e:
+            current_app.logger.warning(f"Result count failed: {str(e)}")
+            return results, len(rows), False
+        return results, row_count, row_count < RESULT_COUNT_LIMIT
+
     def execute_sql_query(self, project_id: int, sql_query: str, 
-                        limit: int = 100) -> Dict[str, Any]:
-        """Execute SQL query on project data"""
+                        limit: int = 100, preview_rows: int = None) -> Dict[str, Any]:
+        """Execute SQL query on project data, keeping at most preview_rows rows in 'data'"""
         try:
             import os
             # Security validation
             sql_lower = sql_query.lower().strip()
-            
-            # Only allow SELECT statements
-            if not sql_lower.startswith('select'):
-                return {'error': 'Only SELECT statements are allowed'}
-            
-            # Prevent dangerous operations
-            dangerous_keywords = ['drop', 'delete', 'insert', 'update', 'alter', 'create', 'truncate']
-            if any(keyword in sql_lower for keyword in dangerous_keywords):
-                return {'error': 'Dangerous SQL operations are not allowed'}
+            error = self._validate_select_sql(sql_query)
+            if error:
+                return {'error': error}
             
             # Get the main application database path with better error handling
             db_uri = current_app.config.get('SQLALCHEMY_DATABASE_URI', '')
@@ -642,25 +762,20 @@ class SearchService:
                     print(f"Executing SQLAlchemy query: {sql_query}")
                     # Execute query using SQLAlchemy
                     result = db.session.execute(text(sql_query))
-                    rows = result.fetchall()
-                    
-                    # Get column names
-                    columns = list(result.keys()) if rows else []
+                    columns = list(result.keys())
                     
-                    # Convert to list of dicts
-                    results = []
-                    for row in rows:
-                        # Convert Row object to dict
-                        row_dict = {}
-                        for i, col in enumerate(columns):
-                            row_dict[col] = row[i] if i < len(row) else None
-                        results.append(row_dict)
+                    results, row_count, row_count_exact = self._collect_rows(
+                        lambda size=None: result.fetchmany(size) if size else result.fetchall(),
+                        columns, sql_query, preview_rows,
+                        lambda count_sql: db.session.execute(text(count_sql)).scalar()
+                    )
                     
                     return {
                         'status': 'success',
                         'data': results,
-                        'row_count': len(results),
-                        'columns': columns,
+                        'row_count': row_count,
+                        'row_count_exact': row_count_exact,
+                        'columns': columns if row_count else [],
                         'query': sql_query,
                         'method': 'sqlalchemy'
                     }
@@ -677,28 +792,30 @@ class SearchService:
             conn.row_factory = sqlite3.Row  # This enables column access by name
             cursor = conn.cursor()
             
-            # Add LIMIT if not present
-            if 'limit' not in sql_lower:
+            # Add LIMIT if not present; with preview_rows only the preview is
+            # fetched and the full result is counted in SQL
+            if preview_rows is None and 'limit' not in sql_lower:
                 sql_query = f"{sql_query.rstrip(';')} LIMIT {limit}"
             
             # Execute the query
             cursor.execute(sql_query)
-            rows = cursor.fetchall()
             
-            # Convert to list of dicts
-            results = []
-            columns = []
-            if rows:
-                columns = [description[0] for description in cursor.description]
-                for row in rows:
-                    results.append(dict(zip(columns, row)))
+            columns = [description[0] for description in cursor.description]
+            results, row_count, row_count_exact = self._collect_rows(
+                lambda size=None: cursor.fetchmany(size) if size else cursor.fetchall(),
+                columns, sql_query, preview_rows,
+                lambda count_sql: conn.execute(count_sql).fetchone()[0]
+            )
+            if not row_count:
+                columns = []
             
             conn.close()
             
             return {
                 'status': 'success',
                 'data': results,
-                'row_count': len(results),
+                'row_count': row_count,
+                'row_count_exact': row_count_exact,
                 'columns': columns,
                 'query': sql_query,
                 'method': 'sqlite'
@@ -206,7 +206,7 @@ const DatabaseBrowser = () => {
             </div>
             
             <div className="flex-1 overflow-auto p-6">
-              {tableData.data.length === 0 ? (
+              {tableData.rows.length === 0 ? (
                 <p className="text-gray-500 text-center py-8">No data in this table</p>
               ) : (
                 <div className="overflow-x-auto">
@@ -224,15 +224,15 @@ const DatabaseBrowser = () => {
                       </tr>
                     </thead>
                     <tbody className="bg-white divide-y divide-gray-200">
-                      {tableData.data.map((row, index) => (
+                      {tableData.rows.map((row, index) => (
                         <tr key={index} className="hover:bg-gray-50">
-                          {tableData.columns.map((column) => (
+                          {tableData.columns.map((column, columnIndex) => (
                             <td
                               key={column}
                               className="px-6 py-4 whitespace-nowrap text-sm text-gray-900"
                             >
-                              {row[column] !== null && row[column] !== undefined
-                                ? String(row[column])
+                              {row[columnIndex] !== null && row[columnIndex] !== undefined
+                                ? String(row[columnIndex])
                                 : '-'}
                             </td>
                           ))}
@@ -479,11 +479,20 @@ const SQLExecutor = () => {
                 <div className="flex items-center justify-between mb-4">
                   <span className="text-sm text-gray-600">
                     {results.row_count} rows returned
+                    {results.auto_limit && ` (limited to ${results.auto_limit})`}
                   </span>
                   <CheckCircleIcon className="h-5 w-5 text-green-500" />
                 </div>
                 
-                {results.data && results.data.length > 0 ? (
+                {results.warnings && results.warnings.length > 0 && (
+                  <ul className="mb-4 text-sm text-yellow-700">
+                    {results.warnings.map((warning, index) => (
+                      <li key={index}>• {warning}</li>
+                    ))}
+                  </ul>
+                )}
+                
+                {results.rows && results.rows.length > 0 ? (
                   <div className="overflow-x-auto">
                     <table className="min-w-full divide-y divide-gray-200">
                       <thead className="bg-gray-50">
@@ -499,15 +508,15 @@ const SQLExecutor = () => {
                         </tr>
                       </thead>
                       <tbody className="bg-white divide-y divide-gray-200">
-                        {results.data.map((row, index) => (
+                        {results.rows.map((row, index) => (
                           <tr key={index} className="hover:bg-gray-50">
-                            {results.columns.map((column) => (
+                            {results.columns.map((column, columnIndex) => (
                               <td
                                 key={column}
                                 className="px-6 py-4 whitespace-nowrap text-sm text-gray-900"
                               >
-                                {row[column] !== null && row[column] !== undefined
-                                  ? String(row[column])
+                                {row[columnIndex] !== null && row[columnIndex] !== undefined
+                                  ? String(row[columnIndex])
                                   : '-'}
                               </td>
                             ))}
@@ -160,24 +160,31 @@ const ChatTab = () => {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ query }),
+        body: JSON.stringify({ query, stream_answer: true }),
       });
 
       const data = await response.json();
 
       if (data.status === 'success') {
+        const messageId = `quick-${Date.now()}`;
         const assistantMessage = {
+          id: messageId,
           type: 'assistant',
-          content: data.final_response,
+          content: data.final_response || '',
           sql_query: data.sql_query,
           results: data.results,
           result_count: data.result_count,
+          results_url: data.results_url,
           processing_time: data.processing_time,
           timestamp: new Date().toISOString()
         };
 
         setChatHistory(prev => [...prev, assistantMessage]);
         setQuery('');
+
+        if (data.answer_stream_url) {
+          streamAnswer(data.answer_stream_url, messageId);
+        }
         
         // Update session if new
         if (data.session_id && data.session_id !== sessionId) {
@@ -209,6 +216,33 @@ const ChatTab = () => {
     }
   };
 
+  // Fill in an assistant message from the server-sent answer stream
+  const streamAnswer = (url, messageId) => {
+    const updateContent = (update) => {
+      setChatHistory(prev => prev.map(message =>
+        message.id === messageId ? { ...message, content: update(message.content) } : message
+      ));
+    };
+    const source = new EventSource(url);
+
+    source.addEventListener('delta', (event) => {
+      const { text } = JSON.parse(event.data);
+      updateContent(content => content + text);
+    });
+    source.addEventListener('done', (event) => {
+      const { final_response } = JSON.parse(event.data);
+      updateContent(() => final_response);
+      source.close();
+    });
+    source.addEventListener('error', (event) => {
+      if (event.data) {
+        const { error } = JSON.parse(event.data);
+        toast.error(error || 'Answer generation failed');
+      }
+      source.close();
+    });
+  };
+
   const handleStepByStepQuery = async () => {
     if (!query.trim() || !activeProject) return;
 
@@ -290,6 +324,7 @@ const ChatTab = () => {
             sql_query: data.sql_query,
             results: data.results,
             result_count: data.result_count,
+            results_url: data.results_url,
             timestamp: new Date().toISOString()
           };
 
@@ -620,9 +655,14 @@ const ChatMessage = ({ message }) => {
                   ))}
                 </tbody>
               </table>
-              {message.results.length > 10 && (
+              {(message.result_count || message.results.length) > 10 && (
                 <p className="text-xs text-gray-500 mt-2">
-                  ... and {message.results.length - 10} more rows
+                  ... and {(message.result_count || message.results.length) - 10} more rows
+                  {message.results_url && (
+                    <a href={message.results_url} className="ml-2 text-blue-600 hover:underline">
+                      Download all (NDJSON)
+                    </a>
+                  )}
                 </p>
               )}
             </div>